@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class ProfileConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Profile'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (registers receivers)
@@ -0,0 +1,45 @@
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+USER_CACHE_TIMEOUT = 60 * 60
+
+
+def user_cache_key(user_id):
+    return f"auth_user:{user_id}"
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend whose per-request user lookup is served from the cache.
+
+    The user is cached with its Profile already joined, so `request.user` and
+    `request.user.profile` cost no queries once warm. Profile/signals.py drops the
+    entry whenever the User or Profile is saved or deleted.
+
+    The password hash is never cached: the cached copy has `password` deferred
+    (loaded from the database if something reads it, and left out of save()), and
+    carries only the session auth hash that django.contrib.auth checks per request.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        cached = cache.get(key)
+        if cached is None:
+            user = User._default_manager.select_related("profile").filter(pk=user_id).first()
+            if user is None:
+                return None
+            session_hash = user.get_session_auth_hash()
+            del user.__dict__["password"]  # now a deferred field
+            cached = (user, session_hash)
+            cache.set(key, cached, USER_CACHE_TIMEOUT)
+        user, session_hash = cached
+        user.get_session_auth_hash = lambda: _session_auth_hash(user, session_hash)
+        return user if self.user_can_authenticate(user) else None
+
+
+def _session_auth_hash(user, cached_hash):
+    # Once the password is loaded or changed (set_password), hash the real one.
+    if "password" in user.__dict__:
+        return User.get_session_auth_hash(user)
+    return cached_hash
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Profile', '0005_payment_idempotency_subscription_unique'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['user_id', '-payment_date'], name='idx_payment_user_date'),
+        ),
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['user_id', 'start_date', 'end_date'], name='idx_sub_user_dates'),
+        ),
+    ]
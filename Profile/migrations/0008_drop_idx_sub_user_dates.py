@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Profile', '0007_payment_idempotency_per_user'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='subscription',
+            name='idx_sub_user_dates',
+        ),
+    ]
@@ -1,6 +1,13 @@
-from django.db import models
+from django.db import connection, models, transaction, IntegrityError
+from django.db.models import F
+from django.utils import timezone
 from django.contrib.auth.models import User
-from datetime import date
+from ragtagnews import cache
+from datetime import date, datetime, time, timedelta
+
+class PurchaseFailed(Exception):
+    """Raised when a purchase could not be recorded (not a replay); nothing was charged or written."""
+
 
 # Profile
 class Profile(models.Model):
@@ -16,27 +23,115 @@ class Profile(models.Model):
         Determines the user's current subscription tier based on active subscriptions.
 
         Returns the tier of the most recently started active subscription,
-        or 'free' if no active subscription is found.
+        or 'free' if no active subscription is found. The answer is cached until
+        midnight (when subscriptions can lapse) or until the next purchase.
         """
+        # Skips the per-process L1 so a purchase is visible on the very next request.
+        return cache.get_or_compute(
+            self.tier_cache_key(), self._lookup_tier, ttl=_seconds_until_midnight(), use_local=False
+        )
+
+    def _lookup_tier(self):
+        # If multiple are active (e.g., an overlapping upgrade),
+        # pick the one that started most recently.
+        subscription = self.active_subscription()
+        return subscription.tier if subscription is not None else "free"
+
+    def tier_cache_key(self):
+        return tier_cache_key(self.pk)
+
+    def invalidate_tier(self):
+        invalidate_tier(self.pk)
+
+    def active_subscription(self):
+        """Returns the most recently started subscription covering today, or None."""
         today = date.today()
-        active_subscriptions = self.subscription_set.filter(
+        return self.subscription_set.filter(
             start_date__lte=today,
             end_date__gte=today
-        )
+        ).order_by('-start_date').first()
+
+    def payment_history(self):
+        return self.payment_set.order_by('-payment_date')
+
+    def purchase_subscription(self, days, amount, idempotency_key):
+        """
+        Extends the active subscription by `days` (or starts one) and records the payment,
+        all in one transaction.
+
+        `idempotency_key` identifies one form submission; replaying it is a no-op.
+        Returns True if a purchase was made, False if the key was already used.
+        Raises PurchaseFailed if it still conflicts after a retry.
+        """
+        payments = Payment.objects.filter(user_id=self, idempotency_key=idempotency_key)
+        if payments.exists():  # replay: answered without taking the lock
+            return False
+
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    self._lock_for_purchase()
+                    if payments.exists():
+                        return False
+
+                    subscription = self.active_subscription()
+                    if subscription is not None:
+                        # Extend in SQL so a concurrent extension can't be overwritten.
+                        Subscription.objects.filter(pk=subscription.pk).update(
+                            end_date=F('end_date') + timedelta(days=days)
+                        )
+                    else:
+                        # uq_subscription_user_start stops two concurrent first purchases.
+                        subscription = Subscription.objects.create(
+                            user_id=self,
+                            tier="Standard",
+                            start_date=date.today(),
+                            end_date=date.today() + timedelta(days=days),
+                        )
+
+                    Payment.objects.create(
+                        user_id=self,
+                        amount=amount,
+                        payment_method="Credit Card",
+                        transaction_id=subscription.pk,
+                        payment_status="PID",
+                        idempotency_key=idempotency_key,
+                    )
+            except IntegrityError as e:
+                # Either the same submission landed concurrently (key taken) or another
+                # submission created today's subscription first; retry once as an extension.
+                if payments.exists():
+                    return False
+                if attempt:
+                    raise PurchaseFailed("The purchase conflicted with another change; nothing was recorded.") from e
+                continue
+            transaction.on_commit(self.invalidate_tier)
+            return True
+
+    def _lock_for_purchase(self):
+        """Serializes this user's purchases until the surrounding transaction ends.
+
+        Backends with row locks lock the profile row. SQLite has only the database
+        write lock, so it is taken up front with a write: a concurrent purchase then
+        waits for it (busy timeout) instead of failing to upgrade a read lock later.
+        """
+        if connection.vendor == "sqlite":
+            Profile.objects.filter(pk=self.pk).update(updated_at=timezone.now())
+        else:
+            Profile.objects.select_for_update().only('pk').get(pk=self.pk)
+
+
+def tier_cache_key(profile_id):
+    return f"profile:{profile_id}:tier"
 
-        if active_subscriptions.exists():
-            # If multiple are active (e.g., an overlapping upgrade),
-            # pick the one that started most recently.
-            latest_subscription = active_subscriptions.latest('start_date')
-            return latest_subscription.tier
 
-        return "free"
+def invalidate_tier(profile_id):
+    cache.delete(tier_cache_key(profile_id))
 
-    def save(self, *args, **kwargs):
-        # Update related User model if needed
-        if hasattr(self, 'user'):
-            self.user.save()
-        super(Profile, self).save(*args, **kwargs)
+
+def _seconds_until_midnight():
+    tomorrow = datetime.combine(date.today() + timedelta(days=1), time.min)
+    return max(1, int((tomorrow - datetime.now()).total_seconds()))
 
 # Subsciption
 class Subscription(models.Model):
@@ -46,6 +141,14 @@ class Subscription(models.Model):
     start_date = models.DateField()
     end_date = models.DateField()
 
+    class Meta:
+        constraints = [
+            # Purchases extend the active subscription, so a user only ever starts one per day.
+            # Also serves the active-subscription lookup (user_id = ? AND start_date <= today
+            # ORDER BY start_date DESC), walked backwards; end_date is checked on the few rows it meets.
+            models.UniqueConstraint(fields=["user_id", "start_date"], name="uq_subscription_user_start"),
+        ]
+
 # PaymentHistory
 class Payment(models.Model):
     user_id = models.ForeignKey('Profile.Profile', on_delete=models.CASCADE)
@@ -53,4 +156,16 @@ class Payment(models.Model):
     payment_method = models.CharField(max_length=20, blank=True, null=True)
     payment_date = models.DateTimeField(auto_now_add=True)
     transaction_id = models.CharField(max_length=255, blank=True, null=True)
-    payment_status = models.CharField(max_length=20, blank=True, null=True)
\ No newline at end of file
+    payment_status = models.CharField(max_length=20, blank=True, null=True)
+    # One per purchase form render; a replayed or double-clicked submission reuses it.
+    idempotency_key = models.CharField(max_length=64, blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            # Keys are only meaningful per user: one user's key can't block another's purchase.
+            models.UniqueConstraint(fields=["user_id", "idempotency_key"], name="uq_payment_user_idempotency"),
+        ]
+        indexes = [
+            # Per-user payment history, newest first.
+            models.Index(fields=["user_id", "-payment_date"], name="idx_payment_user_date"),
+        ]
\ No newline at end of file
@@ -0,0 +1,29 @@
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import user_cache_key
+from .models import Profile, Subscription, invalidate_tier
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    cache.delete(user_cache_key(instance.pk))
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_cached_user_profile(sender, instance, **kwargs):
+    cache.delete(user_cache_key(instance.user_id))
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_cached_tier(sender, instance, **kwargs):
+    # After commit, so a concurrent lookup can't re-cache the old tier in between.
+    transaction.on_commit(partial(invalidate_tier, instance.user_id_id))
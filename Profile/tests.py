@@ -1,3 +1,187 @@
+from datetime import date, timedelta
+from unittest import mock
+
+import pickle
+
+from django.contrib.auth.models import User
+from django.core.cache import cache as shared
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .backends import user_cache_key
+from .models import Payment, Profile, PurchaseFailed, Subscription
+
+
+class HotLookupQueryPlanTests(TestCase):
+    """The tier check and payment history must stay index searches as the tables grow."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = Profile.objects.create(user=User.objects.create(username="reader"))
+        other = Profile.objects.create(user=User.objects.create(username="other"))
+        today = date.today()
+        for i in range(50):
+            for owner in (cls.profile, other):
+                Subscription.objects.create(
+                    user_id=owner, tier="Standard",
+                    start_date=today - timedelta(days=100 + i), end_date=today - timedelta(days=90 + i),
+                )
+                Payment.objects.create(user_id=owner, amount=1)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertIndexSearch(self, queryset, table):
+        if connection.vendor != "sqlite":
+            self.skipTest("EXPLAIN QUERY PLAN is SQLite-specific.")
+        self.assertPlanSearches(queryset.explain(), table)
+
+    def assertPlanSearches(self, plan, table):
+        self.assertIn(f"SEARCH {table} USING", plan)
+        self.assertNotIn(f"SCAN {table}", plan)
+        self.assertNotIn("TEMP B-TREE", plan)  # ORDER BY comes from the index, not a sort
+
+    def test_active_subscription_lookup(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("EXPLAIN QUERY PLAN is SQLite-specific.")
+        # Explain the exact statement active_subscription() runs.
+        with CaptureQueriesContext(connection) as queries:
+            self.profile.active_subscription()
+        self.assertEqual(len(queries), 1)
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + queries[0]["sql"])
+            plan = "\n".join(row[-1] for row in cursor.fetchall())
+        self.assertPlanSearches(plan, Subscription._meta.db_table)
+
+    def test_payment_history_lookup(self):
+        self.assertIndexSearch(self.profile.payment_history(), Payment._meta.db_table)
+
+    def test_current_tier_is_one_query(self):
+        self.profile.invalidate_tier()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.profile.get_current_tier(), "free")
+        with self.assertNumQueries(0):
+            self.profile.get_current_tier()
+
+
+class PurchaseSubscriptionTests(TestCase):
+    """One payment per submission, all-or-nothing writes, and a tier cache that follows them."""
+
+    def setUp(self):
+        self.profile = Profile.objects.create(user=User.objects.create(username="buyer"))
+
+    def purchase(self, key="key-1", profile=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return (profile or self.profile).purchase_subscription(30, 10, key)
+
+    def test_double_submission_creates_one_payment(self):
+        self.assertTrue(self.purchase())
+        self.assertFalse(self.purchase())
+        self.assertEqual(Payment.objects.filter(user_id=self.profile).count(), 1)
+        subscription = Subscription.objects.get(user_id=self.profile)
+        self.assertEqual(subscription.end_date, date.today() + timedelta(days=30))
+
+    def test_keys_are_per_user(self):
+        other = Profile.objects.create(user=User.objects.create(username="other"))
+        self.assertTrue(self.purchase())
+        self.assertTrue(self.purchase(profile=other))
+        self.assertEqual(Payment.objects.filter(idempotency_key="key-1").count(), 2)
+
+    def test_second_purchase_extends(self):
+        self.purchase("key-1")
+        self.assertTrue(self.purchase("key-2"))
+        subscription = Subscription.objects.get(user_id=self.profile)
+        self.assertEqual(subscription.end_date, date.today() + timedelta(days=60))
+
+    def test_failed_payment_rolls_back_the_extension(self):
+        self.purchase("key-1")
+        with mock.patch.object(Payment.objects, "create", side_effect=RuntimeError("card declined")):
+            with self.assertRaises(RuntimeError):
+                self.purchase("key-2")
+        subscription = Subscription.objects.get(user_id=self.profile)
+        self.assertEqual(subscription.end_date, date.today() + timedelta(days=30))
+        self.assertEqual(Payment.objects.filter(user_id=self.profile).count(), 1)
+
+    def test_failed_first_purchase_leaves_nothing(self):
+        with mock.patch.object(Payment.objects, "create", side_effect=RuntimeError("card declined")):
+            with self.assertRaises(RuntimeError):
+                self.purchase()
+        self.assertFalse(Subscription.objects.filter(user_id=self.profile).exists())
+
+    def test_repeated_conflict_is_an_error_not_a_replay(self):
+        with mock.patch.object(Payment.objects, "create", side_effect=IntegrityError("conflict")):
+            with self.assertRaises(PurchaseFailed):
+                self.purchase()
+        self.assertFalse(Payment.objects.exists())
+
+    def test_failed_purchase_shows_an_error(self):
+        self.client.force_login(self.profile.user)
+        form = {
+            "action": "purchase", "subscription_days": "30", "card_number": "4111111111111111",
+            "expiration_date": "12/30", "security_code": "123", "country": "US", "zip_code": "12345",
+            "idempotency_key": "key-1",
+        }
+        with mock.patch.object(Profile, "purchase_subscription", side_effect=PurchaseFailed("conflict")):
+            response = self.client.post(reverse("payment"), form)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "could not be completed")
+
+    def test_lock_is_taken_before_any_read(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.purchase()
+        sql = [q["sql"] for q in queries.captured_queries if not q["sql"].startswith(("SAVEPOINT", "RELEASE"))]
+        # sql[0] is the lock-free replay check; the transaction starts with the lock.
+        if connection.vendor == "sqlite":
+            self.assertTrue(sql[1].startswith('UPDATE "Profile_profile"'), sql[1])
+        else:
+            self.assertIn("FOR UPDATE", sql[1])
+
+    def test_subscription_changes_invalidate_the_cached_tier(self):
+        self.profile.invalidate_tier()
+        self.assertEqual(self.profile.get_current_tier(), "free")
+        with self.captureOnCommitCallbacks(execute=True):
+            subscription = Subscription.objects.create(
+                user_id=self.profile, tier="Standard", start_date=date.today(), end_date=date.today() + timedelta(days=1),
+            )
+        self.assertEqual(self.profile.get_current_tier(), "Standard")
+        with self.captureOnCommitCallbacks(execute=True):
+            subscription.delete()
+        self.assertEqual(self.profile.get_current_tier(), "free")
+
+
+class CachedUserTests(TestCase):
+    """request.user comes from the cache, without the password hash."""
+
+    def setUp(self):
+        shared.clear()
+        self.user = User.objects.create_user("cached", password="old-password")
+        Profile.objects.create(user=self.user)
+        self.client.force_login(self.user)
+
+    def request_user(self):
+        return self.client.get("/").wsgi_request.user
+
+    def test_cached_entry_has_no_password_hash(self):
+        self.assertTrue(self.request_user().is_authenticated)
+        cached_user, _ = shared.get(user_cache_key(self.user.pk))
+        self.assertNotIn("password", cached_user.__dict__)
+        self.assertNotIn(self.user.password.encode(), pickle.dumps(shared.get(user_cache_key(self.user.pk))))
+
+    def test_warm_requests_stay_logged_in(self):
+        self.request_user()
+        user = self.request_user()
+        self.assertTrue(user.is_authenticated)
+        self.assertEqual(user.profile.user_id, self.user.pk)
+
+    def test_password_change_ends_other_sessions(self):
+        self.request_user()
+        self.user.set_password("new-password")
+        self.user.save()
+        self.assertFalse(self.request_user().is_authenticated)
 
-# Create your tests here.
+    def test_saving_the_cached_user_keeps_the_password(self):
+        user = self.request_user()
+        user.first_name = "Cached"
+        user.save()
+        self.assertTrue(User.objects.get(pk=self.user.pk).check_password("old-password"))
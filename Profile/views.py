@@ -3,13 +3,12 @@ from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.utils.timezone import now
 from django.contrib import messages
 from logging import getLogger  
+import uuid
 
-from Profile.models import Payment, Subscription  # Add this import
 from .forms import ProfileForm, CustomUserCreationForm  # Import the ProfileForm and CustomUserCreationForm
-from datetime import timedelta, date  # Add this import
+from .models import PurchaseFailed
 
 logger = getLogger(__name__)
 
@@ -67,11 +66,10 @@ def profile(request):
     # Retrieve the logged-in user's profile
     user_profile = request.user.profile
 
-    if not Subscription.objects.filter(user_id=user_profile, start_date__lte=now(), end_date__gte=now()).exists():
-        entry = None
+    entry = user_profile.active_subscription()
+    if entry is None:
         subscription_string = "Not currently subscribed"
     else:
-        entry = Subscription.objects.filter(user_id=user_profile, start_date__lte=now(), end_date__gte=now()).get()
         subscription_string = "Subscribed until " + entry.end_date.strftime("%Y-%m-%d")
     
     return render(request, 'profile.html', {
@@ -110,67 +108,54 @@ def payment(request):
     subscription_string = ""
     form_data = {}
     total_price = 0.0
+    error_message = None
 
     # Retrieve the logged-in user's profile
     user_profile = request.user.profile
-    
-    # Check if User is subscribed
-    if not Subscription.objects.filter(user_id=user_profile, start_date__lte=now(), end_date__gte=now()).exists():
-        entry = None
-        subscription_string = "You are currently not subscribed"
-    else:
-        entry = Subscription.objects.filter(user_id=user_profile, start_date__lte=now(), end_date__gte=now()).get()
-        subscription_string = "You are subscribed until: " + entry.end_date.strftime("%Y-%m-%d")
 
-    if request.method == 'POST':
-        if request.POST['action'] == 'purchase':
+    if request.method == 'POST' and request.POST.get('action') == 'purchase':
+        try:
             subscription_days = int(request.POST.get('subscription_days'))
-            card_number = str(request.POST.get('card_number'))
-            expiration_date = request.POST.get('expiration_date')
-            security_code = int(request.POST.get('security_code'))
-            country = str(request.POST.get('country'))
-            zip_code = int(request.POST.get('zip_code'))
-
             form_data = {
                 "subscription_days": subscription_days,
-                "card_number": card_number,
-                "expiration_date": expiration_date,
-                "security_code": security_code,
-                "country": country,
-                "zip_code": zip_code
+                "card_number": str(request.POST.get('card_number')),
+                "expiration_date": request.POST.get('expiration_date'),
+                "security_code": int(request.POST.get('security_code')),
+                "country": str(request.POST.get('country')),
+                "zip_code": int(request.POST.get('zip_code')),
             }
-
-            if entry is not None:
-                entry.end_date = entry.end_date + timedelta(days=subscription_days)
-                entry.save()
+            idempotency_key = request.POST['idempotency_key']
+        except (KeyError, TypeError, ValueError):
+            error_message = "Please check your payment details and try again."
+        else:
+            if subscription_days < 1:
+                error_message = "Subscription days must be at least 1."
             else:
-                new_subscription = Subscription(
-                    user_id = user_profile,
-                    tier = "Standard",
-                    start_date = date.today(),
-                    end_date = date.today() + timedelta(days=subscription_days),
-                )
-                new_subscription.save()
-                entry = new_subscription
-
-            total_price = PRICE_PER_DAY * subscription_days
-
-            new_payment = Payment(
-                user_id = user_profile,
-                amount = total_price,
-                payment_method = "Credit Card",
-                payment_date = date.today(),
-                transaction_id = entry.pk,
-                payment_status = "PID"
-            )
-            new_payment.save()
-
-            # Redirect to prevent duplicate POST requests from making multiple db entries
-            return redirect('payment')
+                total_price = PRICE_PER_DAY * subscription_days
+                try:
+                    # Replayed submissions (double click, refresh, retry) come back False and write nothing.
+                    if not user_profile.purchase_subscription(subscription_days, total_price, idempotency_key):
+                        logger.info("Ignored duplicate purchase submission %s", idempotency_key)
+                except PurchaseFailed:
+                    logger.warning("Purchase submission %s failed", idempotency_key, exc_info=True)
+                    error_message = "Your purchase could not be completed. Nothing was charged; please try again."
+                else:
+                    # Redirect to prevent duplicate POST requests from making multiple db entries
+                    return redirect('payment')
+
+    # Check if User is subscribed
+    entry = user_profile.active_subscription()
+    if entry is None:
+        subscription_string = "You are currently not subscribed"
+    else:
+        subscription_string = "You are subscribed until: " + entry.end_date.strftime("%Y-%m-%d")
 
     # Shows payment methods and allows to add new ones
     return render(request, 'payment.html', {
         'subscription_string': subscription_string,
         'form_data': form_data,
-        'total_price': total_price
-    })
\ No newline at end of file
+        'total_price': total_price,
+        'error_message': error_message,
+        # A fresh key per rendered form; the purchase path treats a reused key as a no-op.
+        'idempotency_key': uuid.uuid4().hex,
+    })
@@ -2,35 +2,237 @@
 news/admin.py
 
 Admin registration with practical list filters and quick tier actions.
+
+Article and ReadEvent grow to millions of rows, so their changelists avoid
+anything that scans the whole table:
+- counts are estimated (unfiltered) or capped at ADMIN_COUNT_LIMIT (filtered),
+- search is an index-backed prefix match instead of LIKE '%term%',
+- dates are filtered with fixed ranges instead of a date_hierarchy drill-down,
+- bulk actions are single UPDATE statements, and the cache invalidation after
+  them pages through the ids.
 """
 
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth import get_user_model
-from .models import Article, ReadEvent, Source
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils.functional import cached_property
+
+from ragtagnews import cache
+
+from . import detail_cache
+from .models import Article, ArticleDailyReads, FeedSnapshot, Headline, ReadEvent, RollupState, Source, SourceDailyReads, Tag
+
+# Article ids per detail-cache invalidation batch in the tier actions.
+INVALIDATE_BATCH_SIZE = 1000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never runs an unbounded COUNT(*).
+
+    An unfiltered list reports the planner's estimate of the table size when that
+    is above ADMIN_COUNT_LIMIT. Otherwise (filtered, small, or never analyzed) it
+    counts at most ADMIN_COUNT_LIMIT rows, so the last page shown is the limit.
+    """
+
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_COUNT_LIMIT
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = _estimated_rows(queryset)
+            if estimate > limit:
+                return estimate
+        return queryset[:limit].count()
+
+
+def _estimated_rows(queryset):
+    """The planner's row estimate for the table, or 0 when there is none (never analyzed).
+
+    Both come from the last ANALYZE (autovacuum on PostgreSQL; on SQLite see Commands.md),
+    so they may lag recent inserts or pruning.
+    """
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+            row = cursor.fetchone()
+            return max(row[0], 0) if row else 0
+        if connection.vendor == "sqlite":
+            # Each sqlite_stat1 row for the table starts with its row count.
+            try:
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+            except DatabaseError:  # no sqlite_stat1 until the first ANALYZE
+                return 0
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row else 0
+    return 0
+
+
+class PrefixSearchMixin:
+    """
+    Searches `prefix_search_field` by prefix with a range query, which its index can
+    answer (LIKE 'term%' can't use a plain index on SQLite). A number matches the id.
+
+    With `prefix_search_lower`, the range is on LOWER(field) and needs a matching
+    expression index (Article: idx_article_title_lower); SQLite's LOWER() folds ASCII
+    letters only. Otherwise the match is case-sensitive: the prefix is tried as typed
+    and with its first letter capitalized.
+    """
+
+    prefix_search_field = None
+    prefix_search_lower = False
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            return queryset.filter(pk=int(term)), False
+
+        field = self.prefix_search_field
+        if self.prefix_search_lower:
+            prefix = term.lower()
+            queryset = queryset.alias(_prefix_key=Lower(field))
+            return queryset.filter(_prefix_key__gte=prefix, _prefix_key__lt=prefix + "\U0010ffff"), False
+        match = Q()
+        for prefix in {term, term[:1].upper() + term[1:]}:
+            match |= Q(**{f"{field}__gte": prefix, f"{field}__lt": prefix + "\U0010ffff"})
+        return queryset.filter(match), False
+
 
 @admin.register(Source)
 class SourceAdmin(admin.ModelAdmin):
-    list_display = ("name", "type", "enabled", "url")
+    list_display = ("name", "type", "enabled", "article_count", "url")
     list_filter = ("type", "enabled")
     search_fields = ("name", "url")
     ordering = ("name",)
+    readonly_fields = ("article_count",)
+    actions = ("enable_sources", "disable_sources")
+
+    # Only ingest reads `enabled`, so toggling it leaves cached pages valid.
+    @admin.action(description="Enable selected sources")
+    def enable_sources(self, request, queryset):
+        updated = queryset.update(enabled=True)
+        self.message_user(request, f"Enabled {updated} source(s).")
+
+    @admin.action(description="Disable selected sources")
+    def disable_sources(self, request, queryset):
+        updated = queryset.update(enabled=False)
+        self.message_user(request, f"Disabled {updated} source(s).")
+
+
+@admin.register(FeedSnapshot)
+class FeedSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("source", "fetched_at", "size", "codec", "digest")
+    list_filter = ("source",)
+    list_select_related = ("source",)
+    ordering = ("-pk",)
+    readonly_fields = ("source", "fetched_at", "digest", "codec", "size", "content_type")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
 
 @admin.register(Article)
-class ArticleAdmin(admin.ModelAdmin):
+class ArticleAdmin(PrefixSearchMixin, admin.ModelAdmin):
     list_display = ("title", "source", "tier", "published_at", "ingested_at")
-    list_filter = ("source",)
-    search_fields = ("title", "summary", "url")
-    date_hierarchy = "published_at"
+    list_filter = ("tier", "published_at", "source")
+    list_select_related = ("source",)
+    search_fields = ("^title",)
+    prefix_search_field = "title"
+    prefix_search_lower = True
+    search_help_text = "Title prefix (any case) or article id."
     ordering = ("-published_at",)
-    readonly_fields = ("ingested_at", "hash")
+    readonly_fields = ("ingested_at", "hash", "content_hash")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ("make_standard", "make_free")
+
+    @admin.action(description="Set tier to Standard")
+    def make_standard(self, request, queryset):
+        self._set_tier(request, queryset, "standard")
+
+    @admin.action(description="Set tier to Free")
+    def make_free(self, request, queryset):
+        self._set_tier(request, queryset, "free")
+
+    def _set_tier(self, request, queryset, tier):
+        # "Select all" can cover millions of rows, so nothing here loads the ids at once.
+        changed = queryset.exclude(tier=tier)
+        with transaction.atomic():
+            # Headline first: once Article is updated, `changed` matches nothing.
+            Headline.objects.filter(article__in=changed).update(tier=tier)
+            count = changed.update(tier=tier)
+        if count:
+            # update() skips the post_save signals, so drop the cached pages here. This
+            # also covers selected rows that already had the tier; that is harmless.
+            ids = queryset.filter(tier=tier).order_by("pk").values_list("pk", flat=True)
+            last_pk = 0
+            while True:
+                batch = list(ids.filter(pk__gt=last_pk)[:INVALIDATE_BATCH_SIZE])
+                if not batch:
+                    break
+                detail_cache.invalidate(batch)
+                last_pk = batch[-1]
+            cache.bump("articles")
+        self.message_user(request, f"Set {count} article(s) to {tier}.")
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ("name", "article_count")
+    search_fields = ("name",)
+    ordering = ("-article_count",)
+    # Kept by ingest; `manage.py rebuild_facets` repairs it.
+    readonly_fields = ("article_count",)
+
 
 @admin.register(ReadEvent)
-class ReadEventAdmin(admin.ModelAdmin):
+class ReadEventAdmin(PrefixSearchMixin, admin.ModelAdmin):
     list_display = ("user", "article", "date", "created_at")
     list_filter = ("date",)
-    search_fields = ("user__username", "article__title")
-    date_hierarchy = "date"
-    ordering = ("-date", "-created_at")
+    list_select_related = ("user", "article")
+    raw_id_fields = ("user", "article")
+    search_fields = ("^user__username",)
+    prefix_search_field = "user__username"
+    # Usernames are case-sensitive identifiers, and auth_user only has its unique index on them.
+    search_help_text = "Username prefix (case-sensitive; also tried capitalized) or read event id."
+    # Insertion order is chronological, and the primary key needs no sort.
+    ordering = ("-pk",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+
+# Read analytics: the rollup tables, not ReadEvent, back these lists.
+@admin.register(ArticleDailyReads)
+class ArticleDailyReadsAdmin(admin.ModelAdmin):
+    list_display = ("date", "article", "reads")
+    list_filter = ("date",)
+    list_select_related = ("article",)
+    raw_id_fields = ("article",)
+    ordering = ("-date", "-reads")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(SourceDailyReads)
+class SourceDailyReadsAdmin(admin.ModelAdmin):
+    list_display = ("date", "source", "reads")
+    list_filter = ("date", "source")
+    list_select_related = ("source",)
+    ordering = ("-date", "-reads")
+
+
+@admin.register(RollupState)
+class RollupStateAdmin(admin.ModelAdmin):
+    list_display = ("name", "last_id", "updated_at")
+    readonly_fields = ("name", "last_id", "updated_at")
 
 User = get_user_model()
 
@@ -38,4 +240,4 @@ User = get_user_model()
 try:
     admin.site.unregister(User)
 except admin.sites.NotRegistered:
-    pass
\ No newline at end of file
+    pass
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class NewsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
-    name = "news"
\ No newline at end of file
+    name = "news"
+
+    def ready(self):
+        from . import signals  # noqa: F401  (registers receivers)
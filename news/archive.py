@@ -0,0 +1,80 @@
+"""
+news/archive.py
+
+Content-addressed archive of raw feed bodies, so ingest rules can be replayed offline
+(`manage.py reprocess_archive`).
+
+- Each body is stored once, at ARCHIVE_ROOT/<digest[:2]>/<digest>.xml.<codec>, where
+  the digest is the sha256 of the uncompressed bytes.
+- The codec is zstd ("zst") when the optional `zstandard` package is installed, and
+  gzip ("gz") otherwise. Files keep their codec after that, so both can be read.
+- The index (which source, fetched when) is the FeedSnapshot table, written by ingest.
+
+Only file handling lives here, not models, so `parse_file` can run in worker processes.
+"""
+
+import gzip
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+
+def digest(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def archive_path(root, body_digest: str, codec: str) -> Path:
+    return Path(root) / body_digest[:2] / f"{body_digest}.xml.{codec}"
+
+
+def store(body: bytes) -> tuple[str, str]:
+    """Writes `body` to the archive unless it is already there; returns (digest, codec)."""
+    body_digest = digest(body)
+    for codec in ("zst", "gz"):
+        if archive_path(settings.ARCHIVE_ROOT, body_digest, codec).exists():
+            return body_digest, codec
+
+    codec, data = _compress(body)
+    path = archive_path(settings.ARCHIVE_ROOT, body_digest, codec)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return body_digest, codec
+
+
+def read(path) -> bytes:
+    path = Path(path)
+    data = path.read_bytes()
+    if path.suffix == ".zst":
+        import zstandard  # Only needed for archives written with zstd.
+
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def parse_file(path, content_type=""):
+    """Decompresses and parses one archived body; returns the feedparser result.
+
+    Safe to run in a worker process (no database access).
+    """
+    import feedparser
+
+    headers = {"content-type": content_type} if content_type else {}
+    return feedparser.parse(read(path), response_headers=headers)
+
+
+def _compress(body: bytes) -> tuple[str, bytes]:
+    try:
+        import zstandard
+    except ImportError:
+        return "gz", gzip.compress(body, compresslevel=6, mtime=0)
+    return "zst", zstandard.ZstdCompressor(level=settings.ARCHIVE_ZSTD_LEVEL).compress(body)
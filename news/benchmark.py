@@ -0,0 +1,351 @@
+"""
+news/benchmark.py
+
+Load-testing helpers behind `manage.py benchmark`:
+- Seeds a synthetic corpus (sources, articles, users, subscriptions, read history).
+- Serves canned RSS for every seeded source from a local HTTP server, so ingest
+  runs end-to-end without touching the network.
+- Times each hot path, counts its queries, and reports latency percentiles that
+  can be saved as a baseline and compared against on later runs.
+"""
+
+import contextlib
+import io
+import json
+import math
+import random
+import statistics
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from Profile.models import Profile, Subscription
+from . import freshness, headlines, tagging
+from .models import Article, ArticleTag, ReadEvent, Source, Tag
+
+BATCH_SIZE = 5000
+
+
+# --------------------------------------------------------------------------
+# Canned feeds
+# --------------------------------------------------------------------------
+
+def render_feed(source_index: int, items: int) -> bytes:
+    """Builds a deterministic RSS 2.0 document for one stand-in source."""
+    now = timezone.now()
+    tags = list(settings.TAG_ALLOWLIST)
+    entries = []
+    for i in range(items):
+        published = format_datetime(now - timedelta(minutes=15 * i))
+        entries.append(
+            "<item>"
+            f"<title>{escape(f'Bench story {source_index}-{i}')}</title>"
+            f"<link>https://bench-{source_index}.example/story/{i}</link>"
+            f"<description>{escape('Synthetic summary text. ' * 12)}</description>"
+            f"<category>Tech</category><category>{escape(tags[i % len(tags)])}</category>"
+            f"<pubDate>{published}</pubDate>"
+            "</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>Bench source {source_index}</title>"
+        f"<link>https://bench-{source_index}.example/</link>"
+        f"<description>Canned feed</description>{''.join(entries)}</channel></rss>"
+    ).encode("utf-8")
+
+
+class FeedServer:
+    """Local stand-in for publisher feeds: GET /feed/<n>.xml returns canned RSS."""
+
+    def __init__(self, sources: int, items_per_feed: int):
+        bodies = {f"/feed/{i}.xml": render_feed(i, items_per_feed) for i in range(sources)}
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = bodies.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/rss+xml")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep benchmark output readable.
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def url(self, source_index: int) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/feed/{source_index}.xml"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# --------------------------------------------------------------------------
+# Synthetic database
+# --------------------------------------------------------------------------
+
+def seed(server: FeedServer, sources: int, articles: int, users: int, reads_per_user: int, log=print):
+    """Bulk-loads a synthetic corpus. Safe to call on an already-seeded DB (sources are re-pointed)."""
+    rng = random.Random(42)
+
+    # The first sources carry the real STANDARD_SOURCES names, so ingest and the
+    # tier gate see standard articles the way production does.
+    def source_name(i):
+        return settings.STANDARD_SOURCES[i] if i < len(settings.STANDARD_SOURCES) else f"bench-{i}.example"
+
+    # Sources always point at this run's feed server (its port changes per run).
+    existing = list(Source.objects.order_by("pk")[:sources])
+    for i, source in enumerate(existing):
+        source.name = source_name(i)
+        source.url = server.url(i)
+    Source.objects.bulk_update(existing, ["name", "url"])
+    Source.objects.bulk_create(
+        Source(name=source_name(i), type="rss", url=server.url(i), enabled=True)
+        for i in range(len(existing), sources)
+    )
+    Source.objects.exclude(pk__in=Source.objects.order_by("pk").values("pk")[:sources]).update(enabled=False)
+    source_ids = list(Source.objects.order_by("pk").values_list("pk", flat=True)[:sources])
+    standard_ids = set(source_ids[: len(settings.STANDARD_SOURCES)])
+
+    have = Article.objects.count()
+    if have < articles:
+        log(f"Seeding {articles - have} articles...")
+        now = timezone.now()
+        tags = [Tag.objects.get_or_create(name=name)[0] for name in settings.TAG_ALLOWLIST]
+        for start in range(have, articles, BATCH_SIZE):
+            batch = Article.objects.bulk_create(
+                Article(
+                    source_id=source_ids[n % len(source_ids)],
+                    title=f"Seeded headline number {n}",
+                    url=f"https://seed.example/article/{n}",
+                    summary="<p>" + "Seeded summary text. " * 20 + "</p>",
+                    published_at=now - timedelta(minutes=n),
+                    ingested_at=now - timedelta(minutes=n),
+                    tier="standard" if source_ids[n % len(source_ids)] in standard_ids else "free",
+                    hash=f"seed-{n:060d}",
+                )
+                for n in range(start, min(start + BATCH_SIZE, articles))
+            )
+            ArticleTag.objects.bulk_create(
+                ArticleTag(article=article, tag=tags[article.pk % len(tags)], published_at=article.published_at)
+                for article in batch
+            )
+        tagging.recount()
+        # bulk_create skips the signals that keep Headline in step.
+        headlines.rebuild(log=lambda *args: None)
+
+    have = User.objects.filter(username__startswith="bench-").count()
+    if have < users:
+        log(f"Seeding {users - have} users with subscriptions and read history...")
+        password = make_password("bench-password")  # Hash once; hashing is the slow part.
+        today = date.today()
+        article_ids = list(Article.objects.values_list("pk", flat=True))
+        for start in range(have, users, BATCH_SIZE):
+            batch = User.objects.bulk_create(
+                User(username=f"bench-{n}", email=f"bench-{n}@example.com", password=password)
+                for n in range(start, min(start + BATCH_SIZE, users))
+            )
+            profiles = Profile.objects.bulk_create(Profile(user=user) for user in batch)
+
+            # Roughly a third of users hold an active subscription.
+            Subscription.objects.bulk_create(
+                Subscription(
+                    user_id=profile,
+                    tier="Standard",
+                    start_date=today - timedelta(days=rng.randint(0, 30)),
+                    end_date=today + timedelta(days=rng.randint(1, 60)),
+                )
+                for profile in profiles
+                if rng.random() < 0.33
+            )
+
+            events = []
+            for user in batch:
+                for k in range(reads_per_user):
+                    events.append(ReadEvent(
+                        user=user,
+                        article_id=rng.choice(article_ids),
+                        date=today - timedelta(days=k % 30),
+                    ))
+            ReadEvent.objects.bulk_create(events, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+# --------------------------------------------------------------------------
+# Measurement
+# --------------------------------------------------------------------------
+
+@dataclass
+class Result:
+    name: str
+    iterations: int
+    total_seconds: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    max_ms: float
+    throughput: float
+    queries_mean: float
+    queries_max: int
+    extra: dict = field(default_factory=dict)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile over an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def measure(name, func, iterations, warmup=1):
+    """Runs `func` repeatedly, recording wall time and query count per call."""
+    for _ in range(warmup):
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+
+    timings, query_counts = [], []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as queries, contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - t0) * 1000)
+        query_counts.append(len(queries))
+    total = time.perf_counter() - started
+
+    timings.sort()
+    return Result(
+        name=name,
+        iterations=iterations,
+        total_seconds=round(total, 4),
+        p50_ms=round(percentile(timings, 50), 3),
+        p95_ms=round(percentile(timings, 95), 3),
+        p99_ms=round(percentile(timings, 99), 3),
+        mean_ms=round(statistics.fmean(timings), 3),
+        max_ms=round(timings[-1], 3),
+        throughput=round(iterations / total, 2) if total else 0.0,
+        queries_mean=round(statistics.fmean(query_counts), 2),
+        queries_max=max(query_counts),
+    )
+
+
+def _expect_ok(response):
+    if response.status_code >= 400:
+        raise RuntimeError(f"Benchmark request failed with HTTP {response.status_code}.")
+    return response
+
+
+def scenarios(iterations):
+    """Yields (name, callable, iterations) for every hot path we track."""
+    from .ingest import APIFetch
+
+    # Page scenarios measure serving only; the ingest cycle is measured on its own below.
+    freshness.mark_ingested()
+
+    rng = random.Random(7)
+    home = reverse("home")
+    article_ids = list(Article.objects.order_by("-published_at").values_list("pk", flat=True)[:1000])
+    subscribed = set(
+        Subscription.objects.filter(start_date__lte=date.today(), end_date__gte=date.today())
+        .values_list("user_id__user_id", flat=True)
+    )
+    bench_users = list(User.objects.filter(username__startswith="bench-").order_by("pk")[:2000])
+    free_users = [u for u in bench_users if u.pk not in subscribed]
+    standard_users = [u for u in bench_users if u.pk in subscribed]
+    if not free_users or not standard_users:
+        raise RuntimeError("Seed at least a few dozen users so both tiers are represented.")
+
+    anonymous = Client()
+    free = Client()
+    free.force_login(free_users[0])
+    standard = Client()
+    standard.force_login(standard_users[0])
+
+    yield "home_view[anonymous]", lambda: _expect_ok(anonymous.get(home)), iterations
+    yield "home_view[free]", lambda: _expect_ok(free.get(home)), iterations
+    yield "home_view[standard]", lambda: _expect_ok(standard.get(home)), iterations
+    tag = next(iter(settings.TAG_ALLOWLIST))
+    yield f"home_view[tag={tag}]", lambda: _expect_ok(anonymous.get(home, {"tag": tag})), iterations
+    yield (
+        "article_detail_view",
+        lambda: _expect_ok(standard.get(reverse("article_detail", args=[rng.choice(article_ids)]))),
+        iterations * 5,
+    )
+    yield "ingest_cycle", APIFetch.GetContent, iterations
+
+    profiles = list(Profile.objects.filter(user__in=bench_users))
+    yield "get_current_tier", lambda: rng.choice(profiles).get_current_tier(), iterations * 20
+
+    payer = Client()
+    payer.force_login(free_users[-1])
+    payment = reverse("payment")
+    form = {
+        "action": "purchase",
+        "subscription_days": "1",
+        "card_number": "4242 4242 4242 4242",
+        "expiration_date": "12/30",
+        "security_code": "123",
+        "country": "US",
+        "zip_code": "57007",
+    }
+    yield "payment_flow", lambda: _expect_ok(payer.post(payment, {**form, "idempotency_key": uuid.uuid4().hex})), iterations
+
+    replayed = {**form, "idempotency_key": uuid.uuid4().hex}
+    yield "payment_replay", lambda: _expect_ok(payer.post(payment, replayed)), iterations
+
+
+# --------------------------------------------------------------------------
+# Baselines
+# --------------------------------------------------------------------------
+
+def save_baseline(path, results, meta):
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({"meta": meta, "results": [asdict(r) for r in results]}, fh, indent=2)
+
+
+def compare_to_baseline(path, results, tolerance):
+    """Returns human-readable regressions: p95 slower than baseline by more than `tolerance`,
+    or more queries than the baseline issued."""
+    with open(path, encoding="utf-8") as fh:
+        baseline = {r["name"]: r for r in json.load(fh)["results"]}
+
+    regressions = []
+    for result in results:
+        old = baseline.get(result.name)
+        if old is None:
+            continue
+        if old["p95_ms"] and result.p95_ms > old["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{result.name}: p95 {result.p95_ms:.1f}ms vs baseline {old['p95_ms']:.1f}ms"
+            )
+        if result.queries_max > old["queries_max"]:
+            regressions.append(
+                f"{result.name}: {result.queries_max} queries vs baseline {old['queries_max']}"
+            )
+    return regressions
@@ -0,0 +1,251 @@
+"""
+news/corpus.py
+
+Streaming export/import of the bulk tables, for seeding a new environment or
+restoring one (`manage.py export_corpus` / `manage.py import_corpus`).
+
+Format: a directory with manifest.json plus, per model, numbered gzip files of
+JSON lines (`news.article-00000.jsonl.gz`, ...). Each line is one row, a JSON
+array in the manifest's column order. Files hold at most BULK_CHUNK_ROWS rows.
+
+- Export pages through each table by primary key, so memory stays flat however
+  large the table is. It holds no transaction, so writers are never blocked for
+  longer than one page read. Instead, every table's highest primary key is read
+  up front and rows above it are left out: rows added during the export are not
+  exported, so every exported row's parent is exported too (parents come first).
+  Rows updated mid-export are written as they were when their page was read.
+- Import needs empty tables. It drops each table's secondary indexes, inserts rows
+  with executemany in batches of BULK_BATCH_SIZE (one transaction per file), then
+  recreates the indexes, so each index is built once instead of row by row.
+  Primary keys, unique constraints and foreign keys stay in force throughout.
+
+dumpdata/loaddata remain the tool for small tables and fixtures.
+"""
+
+import gzip
+import io
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from ragtagnews.db_router import use_primary
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+
+# Parents before children. Users and profiles come along because reads,
+# subscriptions and payments point at them.
+MODELS = (
+    "auth.user",
+    "Profile.profile",
+    "news.source",
+    "news.article",
+    "news.tag",
+    "news.articletag",
+    "news.readevent",
+    "Profile.subscription",
+    "Profile.payment",
+)
+
+# Values JSON can't carry natively are written as strings and parsed back by the field.
+_CONVERTED_TYPES = {"DateTimeField", "DateField", "TimeField", "DecimalField", "DurationField", "UUIDField"}
+
+
+def _model(label):
+    return apps.get_model(label)
+
+
+def _encode(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot export {type(value).__name__}")
+
+
+@use_primary()
+def export(directory, labels=MODELS, log=print):
+    """Writes `labels` to `directory`; returns the manifest."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    batch_size = settings.BULK_BATCH_SIZE
+    chunk_rows = settings.BULK_CHUNK_ROWS
+    manifest = {"format": FORMAT_VERSION, "models": []}
+
+    # Highest primary key per table, read before any rows (see the module docstring).
+    bounds = {label: _model(label)._base_manager.aggregate(bound=Max("pk"))["bound"] or 0 for label in labels}
+
+    for label in labels:
+        model = _model(label)
+        bound = bounds[label]
+        fields = model._meta.concrete_fields
+        entry = {
+            "label": model._meta.label_lower,
+            "columns": [field.column for field in fields],
+            "rows": 0,
+            "files": [],
+        }
+        queryset = (
+            model._base_manager.filter(pk__lte=bound)
+            .order_by("pk").values_list(*(field.attname for field in fields))
+        )
+        pk_index = [field.attname for field in fields].index(model._meta.pk.attname)
+
+        out, last_pk = None, None
+        try:
+            while True:
+                page = queryset.filter(pk__gt=last_pk) if last_pk is not None else queryset
+                rows = list(page[:batch_size])
+                if not rows:
+                    break
+                for row in rows:
+                    if entry["rows"] % chunk_rows == 0:
+                        if out is not None:
+                            out.close()
+                        name = f"{entry['label']}-{len(entry['files']):05d}.jsonl.gz"
+                        entry["files"].append(name)
+                        out = io.TextIOWrapper(
+                            gzip.GzipFile(directory / name, "wb", compresslevel=6, mtime=0), encoding="utf-8"
+                        )
+                    out.write(json.dumps(row, default=_encode, separators=(",", ":")))
+                    out.write("\n")
+                    entry["rows"] += 1
+                last_pk = rows[-1][pk_index]
+        finally:
+            if out is not None:
+                out.close()
+
+        manifest["models"].append(entry)
+        log(f"  {entry['label']}: {entry['rows']} rows in {len(entry['files'])} file(s)")
+
+    (directory / MANIFEST).write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+    return manifest
+
+
+@use_primary()
+def load(directory, labels=None, log=print):
+    """Loads a corpus written by `export` into empty tables; returns rows loaded per model."""
+    directory = Path(directory)
+    manifest = json.loads((directory / MANIFEST).read_text(encoding="utf-8"))
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported corpus format {manifest.get('format')!r}")
+    wanted = labels and {label.lower() for label in labels}
+    entries = [e for e in manifest["models"] if not wanted or e["label"].lower() in wanted]
+
+    # Check everything up front, so a mismatch fails before any table is touched.
+    plan = []
+    for entry in entries:
+        model = _model(entry["label"])
+        fields = {field.column: field for field in model._meta.concrete_fields}
+        if set(entry["columns"]) != set(fields):
+            raise ValueError(
+                f"{entry['label']}: exported columns {sorted(entry['columns'])} "
+                f"don't match the current schema {sorted(fields)}"
+            )
+        if model._base_manager.exists():
+            raise ValueError(f"{entry['label']}: table {model._meta.db_table} is not empty")
+        plan.append((entry, model, [fields[column] for column in entry["columns"]]))
+
+    loaded = {}
+    for entry, model, fields in plan:
+        table = model._meta.db_table
+        indexes = _secondary_indexes(table)
+        with connection.cursor() as cursor:
+            for name, _ in indexes:
+                cursor.execute(f"DROP INDEX {connection.ops.quote_name(name)}")
+        try:
+            loaded[entry["label"]] = _load_model(directory, entry, table, fields)
+        finally:
+            with connection.cursor() as cursor:
+                for _, create_sql in indexes:
+                    cursor.execute(create_sql)
+        log(f"  {entry['label']}: {loaded[entry['label']]} rows, {len(indexes)} index(es) rebuilt")
+
+    # Explicit ids leave PostgreSQL sequences behind (a no-op on SQLite).
+    models = [model for _, model, _ in plan]
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+    return loaded
+
+
+def _load_model(directory, entry, table, fields):
+    quote = connection.ops.quote_name
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        quote(table), ", ".join(quote(field.column) for field in fields), ", ".join(["%s"] * len(fields))
+    )
+    converters = [
+        (i, _converter(field)) for i, field in enumerate(fields) if field.get_internal_type() in _CONVERTED_TYPES
+    ]
+    batch_size = settings.BULK_BATCH_SIZE
+    total = 0
+
+    for name in entry["files"]:
+        # One transaction per file: few commits, and a failed file rolls back cleanly.
+        with transaction.atomic(), connection.cursor() as cursor, gzip.open(
+            directory / name, "rt", encoding="utf-8"
+        ) as lines:
+            batch = []
+            for line in lines:
+                row = json.loads(line)
+                for i, convert in converters:
+                    if row[i] is not None:
+                        row[i] = convert(row[i])
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    cursor.executemany(sql, batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(sql, batch)
+                total += len(batch)
+    if total != entry["rows"]:
+        raise ValueError(f"{entry['label']}: manifest lists {entry['rows']} rows, files held {total}")
+    return total
+
+
+def _converter(field):
+    """Exported string -> database value for `field`.
+
+    Datetimes and dates are in almost every row, so they skip the generic
+    to_python/get_db_prep_save path, which otherwise dominates the load time.
+    """
+    ops = connection.ops
+    kind = field.get_internal_type()
+    if kind == "DateTimeField":
+        return lambda value: ops.adapt_datetimefield_value(datetime.fromisoformat(value))
+    if kind == "DateField":
+        return lambda value: ops.adapt_datefield_value(date.fromisoformat(value))
+    return lambda value: field.get_db_prep_save(field.to_python(value), connection)
+
+
+def _secondary_indexes(table):
+    """(name, CREATE INDEX statement) of the table's non-unique indexes.
+
+    Unique indexes stay in place: they are constraints, not just lookups. Backends
+    other than SQLite and PostgreSQL keep all their indexes during the load.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = %s "
+                "AND sql IS NOT NULL AND sql NOT LIKE 'CREATE UNIQUE%%'",
+                [table],
+            )
+        elif connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT i.indexname, i.indexdef FROM pg_indexes i WHERE i.tablename = %s "
+                "AND i.indexdef NOT LIKE 'CREATE UNIQUE%%' "
+                "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname)",
+                [table],
+            )
+        else:
+            return []
+        return cursor.fetchall()
@@ -0,0 +1,73 @@
+"""
+news/detail_cache.py
+
+Pre-rendered article detail bodies.
+
+Articles don't change after ingest except for their tier, so the article part of
+the detail page is rendered once and cached in the two-level cache under the
+article's own namespace (`article:<id>`). Invalidating an article bumps that
+namespace, and the next read renders under the new version.
+
+Per-user parts (tier gate, metering) are applied by the view on top of the cached entry.
+
+Misses render from the primary: a replica may still hold the row from before the
+save that invalidated the entry, and caching that would keep serving it (old tier
+included) for DETAIL_CACHE_SECONDS.
+"""
+
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from ragtagnews import cache
+from ragtagnews.db_router import use_primary
+
+from .models import Article
+
+# Serving a detail page a little stale while it is re-rendered is fine.
+STALE_SECONDS = 60
+
+
+def _namespace(article_id):
+    return f"article:{article_id}"
+
+
+def get_detail(article_id):
+    """Returns the cached entry for an article (rendering it on a miss), or None if it doesn't exist."""
+    return cache.get_or_compute(
+        "detail",
+        lambda: _load(article_id),
+        ttl=settings.DETAIL_CACHE_SECONDS,
+        stale_ttl=STALE_SECONDS,
+        namespace=_namespace(article_id),
+    )
+
+
+@use_primary()
+def _load(article_id):
+    return _render(Article.objects.select_related("source").filter(pk=article_id).first())
+
+
+def warm(article):
+    """Renders `article` and stores it as the current detail entry."""
+    return cache.put(
+        "detail",
+        _render(article),
+        ttl=settings.DETAIL_CACHE_SECONDS,
+        stale_ttl=STALE_SECONDS,
+        namespace=_namespace(article.pk),
+    )
+
+
+def invalidate(article_ids):
+    cache.bump_many(_namespace(article_id) for article_id in article_ids)
+
+
+def _render(article):
+    if article is None:
+        return None
+    return {
+        "id": article.pk,
+        "title": article.title,
+        "tier": article.tier,
+        "body": render_to_string("article_body.html", {"article": article}),
+    }
@@ -0,0 +1,173 @@
+"""
+news/digests.py
+
+Daily email digests (`manage.py build_digests`).
+
+- Recipients are grouped by tier in one pass: one query loads every active
+  subscription, then profiles are streamed in primary-key order. No per-user
+  get_current_tier() call is made.
+- Each tier's digest (subject, text and HTML parts) is rendered and MIME-encoded
+  once. A recipient's envelope is just To/Date/Message-ID headers in front of
+  the shared bytes, so rendering cost grows with the number of tiers, not users.
+- Envelopes are written in chunks of DIGEST_CHUNK_SIZE by a process pool to
+  DIGEST_OUTBOX/<date>/<tier>-<n>.mbox (the hand-off point for a mailer).
+  Message-IDs are derived from the date and profile, so a re-run rewrites the
+  same messages.
+"""
+
+import os
+import re
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date
+from email.message import EmailMessage
+from email.utils import format_datetime, formataddr, parseaddr
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from ragtagnews.db_router import use_primary
+
+from Profile.models import Profile, Subscription
+
+from . import rollups
+from .models import Headline
+
+# Shared by every envelope in a worker process, set once by _init_worker.
+_parts = {}
+
+
+def resolve_tiers(day):
+    """{profile id: tier} for every profile with an active subscription on `day`.
+
+    Same rule as Profile.get_current_tier(): the most recently started active
+    subscription wins. Profiles missing here are "free".
+    """
+    tiers = {}
+    active = Subscription.objects.filter(start_date__lte=day, end_date__gte=day).order_by("user_id", "start_date")
+    for profile_id, tier in active.values_list("user_id", "tier").iterator(chunk_size=settings.DIGEST_CHUNK_SIZE):
+        tiers[profile_id] = tier.lower()
+    return tiers
+
+
+def recipients(batch_size):
+    """Streams (profile id, username, email) for every active user with an email address."""
+    profiles = (
+        Profile.objects.filter(user__is_active=True).exclude(user__email="")
+        .order_by("pk").values_list("pk", "user__username", "user__email")
+    )
+    last_pk = 0
+    while True:
+        batch = list(profiles.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return
+        yield from batch
+        last_pk = batch[-1][0]
+
+
+def render_tier(tier, day):
+    """(head, body) bytes of the tier's digest: MIME headers and parts shared by every recipient."""
+    context = {
+        "day": day,
+        "tier": tier,
+        "paid": tier in settings.PAID_TIERS,
+        "headlines": list(Headline.objects.order_by("-published_at")[: settings.DIGEST_HEADLINES]),
+        "trending": rollups.trending(limit=5),
+        "site_url": settings.SITE_URL.rstrip("/"),
+        "subject": f"The Egg daily digest - {day:%B} {day.day}, {day.year}",
+    }
+    message = EmailMessage()
+    message["Subject"] = context["subject"]
+    message["From"] = settings.DIGEST_FROM_EMAIL
+    message.set_content(render_to_string("digest_email.txt", context))
+    message.add_alternative(render_to_string("digest_email.html", context), subtype="html")
+
+    head, _, body = message.as_bytes().partition(b"\n\n")
+    # mbox quoting, done once here instead of per envelope.
+    return head, re.sub(rb"^(>*From )", rb">\1", body, flags=re.MULTILINE)
+
+
+@use_primary()
+def build(day=None, workers=None, chunk_size=None, log=print):
+    """Writes every digest envelope for `day` to the outbox; returns {tier: recipients}."""
+    day = day or date.today()
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or settings.DIGEST_CHUNK_SIZE
+    outbox = Path(settings.DIGEST_OUTBOX) / day.isoformat()
+    outbox.mkdir(parents=True, exist_ok=True)
+    # A re-run may produce fewer chunks; don't leave the previous run's tail behind.
+    for stale in outbox.glob("*.mbox"):
+        stale.unlink()
+
+    profile_tiers = resolve_tiers(day)
+    tiers = sorted({"free", *profile_tiers.values()})
+    parts = {tier: render_tier(tier, day) for tier in tiers}
+    log(f"Rendered {len(parts)} digest(s): {', '.join(tiers)}")
+
+    # Date is when this run sends, the same for every message of the run.
+    now = timezone.localtime()
+    sent_at = (format_datetime(now), now.strftime("%a %b %d %H:%M:%S %Y"))
+    domain = parseaddr(settings.DIGEST_FROM_EMAIL)[1].rpartition("@")[2] or "localhost"
+    counts = {tier: 0 for tier in tiers}
+    chunks = {tier: [] for tier in tiers}
+
+    # Forked workers must not share this process's database connections.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(parts,)) as pool:
+        pending = set()
+
+        def submit(tier):
+            n = counts[tier] // chunk_size
+            counts[tier] += len(chunks[tier])
+            pending.add(pool.submit(
+                _write_chunk, outbox / f"{tier}-{n:05d}.mbox", tier, chunks[tier], sent_at, day.isoformat(), domain
+            ))
+            chunks[tier] = []
+            # Keep a bounded number of chunks in flight, so memory stays flat.
+            if len(pending) >= workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+                pending.difference_update(done)
+
+        for profile_id, username, email in recipients(chunk_size):
+            tier = profile_tiers.get(profile_id, "free")
+            chunks[tier].append((profile_id, username, email))
+            if len(chunks[tier]) >= chunk_size:
+                submit(tier)
+        for tier in tiers:
+            if chunks[tier]:
+                submit(tier)
+        for future in pending:
+            future.result()
+
+    for tier in tiers:
+        log(f"  {tier}: {counts[tier]} recipient(s)")
+    return counts
+
+
+def _init_worker(parts):
+    _parts.update(parts)
+
+
+def _write_chunk(path, tier, chunk, sent_at, day, domain):
+    """Writes one mbox file of envelopes around the tier's shared message; returns the count."""
+    head, body = _parts[tier]
+    date_header, from_line = sent_at
+    shared = b"Date: " + date_header.encode() + b"\n" + head + b"\n\n" + body + b"\n"
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for profile_id, username, email in chunk:
+                out.write(b"From MAILER-DAEMON " + from_line.encode() + b"\n")
+                out.write(b"To: " + formataddr((username, email)).encode("utf-8") + b"\n")
+                out.write(f"Message-ID: <digest-{day}-{profile_id}@{domain}>\n".encode())
+                out.write(shared)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return len(chunk)
@@ -0,0 +1,28 @@
+"""
+news/freshness.py
+
+Tracks when the feeds were last ingested (Requirements §4.2 "Freshness").
+
+Ingest runs outside the web workers: cron calls `manage.py ingest_news --if-due`,
+which only ingests when the last run is older than TTL_MINUTES. Pages never start
+an ingest; they are served immediately and show the "stale" badge when content is
+older than TTL_MINUTES. (A refresh thread inside a worker would hold a DB connection,
+compete with requests, and die with the worker mid-run, leaving the lock file behind.)
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+LAST_RUN_KEY = "ingest:last_run"
+
+
+def mark_ingested():
+    cache.set(LAST_RUN_KEY, timezone.now(), None)
+
+
+def ingest_due():
+    last_run = cache.get(LAST_RUN_KEY)
+    return last_run is None or last_run < timezone.now() - timedelta(minutes=settings.TTL_MINUTES)
@@ -0,0 +1,118 @@
+"""
+news/headlines.py
+
+The Headline read model: one slim row per listed article, holding exactly what a
+headline card shows (title, source name, tier, excerpt, thumbnail key, date).
+
+- Rows are written by `sync()` whenever an article is saved (ingest, admin; see
+  news/signals.py). Bulk tier changes update them directly. Deletes cascade.
+- Hidden articles (see `is_listed`) have no row, so the list query needs no filter.
+- idx_headline_list holds every column, newest first, so a headlines page is one
+  index-ordered scan that never touches the table or Article/Source.
+- `rebuild()` regenerates everything from Article; `check()` reports drift
+  (`manage.py rebuild_headlines [--check]`).
+"""
+
+from html import unescape
+
+from django.db import transaction
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+from ragtagnews.db_router import use_primary
+
+from .models import Article, Headline
+from .thumbnails import thumbnail_key
+
+EXCERPT_WORDS = 30
+EXCERPT_CHARS = 400  # Headline.excerpt max_length
+# Articles with "sources" in the title are unreliable trash.
+HIDDEN_TITLE_WORD = "sources"
+# Compared by check(); every column a card shows.
+FIELDS = ("source_id", "source_name", "title", "tier", "excerpt", "thumbnail_key", "published_at")
+
+
+def is_listed(article):
+    return HIDDEN_TITLE_WORD not in article.title.lower()
+
+
+def excerpt(summary):
+    # Plain text (the template escapes it) with a word cap keeps the row and its index entry small.
+    text = Truncator(unescape(strip_tags(summary or ""))).words(EXCERPT_WORDS, truncate=" …")
+    return text[:EXCERPT_CHARS]
+
+
+def headline_for(article):
+    """The Headline row `article` should have (unsaved), or None if it isn't listed."""
+    if not is_listed(article):
+        return None
+    return Headline(
+        article_id=article.pk,
+        source_id=article.source_id,
+        source_name=article.source.name,
+        title=article.title,
+        tier=article.tier,
+        excerpt=excerpt(article.summary),
+        thumbnail_key=thumbnail_key(article.image_url) if article.image_url else "",
+        published_at=article.published_at,
+    )
+
+
+def sync(articles):
+    """Upserts the Headline rows of `articles` (with their sources loaded) and drops hidden ones."""
+    rows, hidden = [], []
+    for article in articles:
+        row = headline_for(article)
+        if row is None:
+            hidden.append(article.pk)
+        else:
+            rows.append(row)
+    if hidden:
+        Headline.objects.filter(pk__in=hidden).delete()
+    if rows:
+        Headline.objects.bulk_create(
+            rows, batch_size=500, update_conflicts=True, unique_fields=["article"], update_fields=FIELDS,
+        )
+
+
+def _batches(batch_size):
+    articles = Article.objects.select_related("source").order_by("pk")
+    last_pk = 0
+    while True:
+        batch = list(articles.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1].pk
+
+
+@use_primary()
+def rebuild(batch_size=2000, log=print):
+    """Regenerates every Headline row from Article; returns the number of articles read."""
+    total = 0
+    for batch in _batches(batch_size):
+        with transaction.atomic():
+            sync(batch)
+        total += len(batch)
+        log(f"  rebuilt headlines through article {batch[-1].pk} ({total} articles)")
+    return total
+
+
+@use_primary()
+def check(batch_size=2000):
+    """Compares Headline with what Article implies; returns {"missing"|"extra"|"stale": [article ids]}."""
+    problems = {"missing": [], "extra": [], "stale": []}
+    for batch in _batches(batch_size):
+        stored = {
+            row.pk: row for row in Headline.objects.filter(pk__gte=batch[0].pk, pk__lte=batch[-1].pk)
+        }
+        for article in batch:
+            expected, row = headline_for(article), stored.get(article.pk)
+            if expected is None:
+                if row is not None:
+                    problems["extra"].append(article.pk)
+            elif row is None:
+                problems["missing"].append(article.pk)
+            elif any(getattr(row, name) != getattr(expected, name) for name in FIELDS):
+                problems["stale"].append(article.pk)
+    return problems
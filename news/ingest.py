@@ -0,0 +1,288 @@
+"""
+news/ingest.py
+
+RSS ingestion pipeline (seed sources -> fetch -> archive -> normalize -> upsert).
+
+Only management commands import this module (`ingest_news` from cron,
+`reprocess_archive`, `benchmark`). Web workers never ingest, so they don't pay
+for feedparser/dateutil at boot.
+"""
+
+from django.conf import settings
+from django.utils import timezone
+from datetime import datetime, timezone as dt_timezone
+import hashlib
+import feedparser
+import requests
+from pathlib import Path
+
+from ragtagnews import cache
+from ragtagnews.db_router import use_primary
+
+from . import archive, detail_cache, freshness, publish, tagging
+from .models import Article, FeedSnapshot, Source
+
+class APIFetch:
+    @staticmethod
+    def GetContent():
+        # 1. --- Concurrency Lock ---
+        # Ensure only one instance of the command runs at a time.
+        lock_file = Path(settings.BASE_DIR) / "ingest_news.lock"
+        if lock_file.exists():
+            raise Exception("Ingestion command is already running. If this is an error, delete the .lock file.")
+        
+        try:
+            lock_file.touch()
+            print("Successfully acquired lock file.")
+
+            # Ingest reads what it is about to write, so replicas (possibly behind) are skipped.
+            with use_primary():
+                # 2. --- Seed Sources ---
+                # Ensure the Source table has entries matching settings.FEEDS
+                APIFetch._seed_sources()
+
+                # 3. --- Main Ingestion Logic ---
+                APIFetch._fetch_and_process_feeds()
+
+                # 4. --- Static feeds and sitemaps (only changed files are rewritten) ---
+                try:
+                    publish.publish()
+                except OSError as e:
+                    print(f"Publishing feeds failed: {e}")
+
+            freshness.mark_ingested()
+
+        finally:
+            # 5. --- Release Lock ---
+            # Guarantees the lock file is removed, even if errors occur.
+            lock_file.unlink()
+            print("Lock file released. Ingestion finished.")
+
+    @staticmethod
+    def _seed_sources():
+        """Ensures the database has a Source object for each URL in settings."""
+        print("Seeding sources from settings...")
+        seeded_count = 0
+        for feed_url in settings.FEEDS:
+            # get_or_create is idempotent and safe to run multiple times.
+            source, created = Source.objects.get_or_create(
+                url=feed_url,
+                defaults={
+                    "name": feed_url.split("//")[-1].split("/")[0],  # Best-effort name
+                    "type": "rss",
+                    "enabled": True,
+                },
+            )
+            if created:
+                seeded_count += 1
+                print(f"  + Created source: {source.name}")
+        
+        if seeded_count > 0:
+            print(f"{seeded_count} new sources were added to the database.")
+        else:
+            print("All sources from settings already existed in the database.")
+
+    @staticmethod
+    def _fetch_and_process_feeds():
+        """Fetches content from all enabled sources and processes their articles."""
+        enabled_sources = Source.objects.filter(enabled=True)
+        print(f"\nFound {enabled_sources.count()} enabled sources to fetch.")
+
+        # Raw date string -> parsed datetime, shared across the cycle. Each source
+        # tends to repeat the same few formats and timestamps.
+        date_cache = {}
+        tagger = tagging.Tagger()
+
+        for source in enabled_sources:
+            print(f"\n--- Fetching from: {source.name} ---")
+            try:
+                feed = APIFetch._fetch(source)
+                APIFetch._process_feed(source, feed, date_cache, tagger)
+            except Exception as e:
+                print(f"Error processing {source.name}: {e}")
+                # The loop continues to the next source.
+
+        # Tags and facet counts are written after each article's save; drop headline
+        # pages cached in between.
+        cache.bump("articles")
+
+    @staticmethod
+    def _fetch(source):
+        """Downloads a feed (with a timeout), archives the raw body, and parses it."""
+        response = requests.get(
+            source.url,
+            timeout=settings.FETCH_TIMEOUT_SECONDS,
+            headers={"User-Agent": f"ragtagnews/1.0 (+{settings.SITE_URL})"},
+        )
+        response.raise_for_status()
+        content_type = response.headers.get("content-type", "")
+        if settings.ARCHIVE_FEEDS:
+            APIFetch._archive(source, response.content, content_type)
+        return feedparser.parse(response.content, response_headers={"content-type": content_type})
+
+    @staticmethod
+    def _archive(source, body, content_type):
+        """Stores the body in the feed archive and indexes it, unless it matches the last fetch."""
+        body_digest = archive.digest(body)
+        last = FeedSnapshot.objects.filter(source=source).order_by("-fetched_at").values_list("digest", flat=True).first()
+        if last == body_digest:
+            return
+        try:
+            body_digest, codec = archive.store(body)
+        except OSError as e:
+            # A full or read-only disk shouldn't stop ingest.
+            print(f"  ? Could not archive feed body: {e}")
+            return
+        FeedSnapshot.objects.create(
+            source=source, digest=body_digest, codec=codec, size=len(body), content_type=content_type[:200]
+        )
+
+    @staticmethod
+    def _process_feed(source, feed, date_cache=None, tagger=None, force=False, retier=False):
+        """Upserts every entry of a parsed feed; returns how many articles were created.
+
+        Shared by live ingest and `reprocess_archive`. `force` re-applies the rules to
+        entries whose fingerprint is unchanged. `retier` also resets stored articles to
+        the tier a new one would get (overriding the admin), and implies `force`.
+        """
+        if feed.bozo:
+            # bozo is true if the feed is malformed.
+            raise ValueError(f"Feed is malformed. Bozo reason: {feed.bozo_exception}")
+
+        # One query tells us which entries are already stored and unchanged.
+        known = None if force or retier else APIFetch._known_fingerprints(feed.entries)
+
+        created = 0
+        for entry in feed.entries:
+            created += APIFetch._process_entry(source, entry, known, date_cache, tagger, retier)
+        return created
+
+    @staticmethod
+    def _process_entry(source, entry, known=None, date_cache=None, tagger=None, retier=False):
+        """Processes a single entry from an RSS feed and upserts it to the database.
+
+        `known` maps dedup hash -> stored fingerprint for this feed; entries that match
+        are skipped before any normalization or writes. `retier` re-applies the initial
+        tier to a stored article. Returns True if an article was created.
+        """
+        # --- Defensive Data Parsing ---
+        if not hasattr(entry, 'link'):
+            print("  - Skipping entry with no link.")
+            return False
+        
+        # --- Deduplication ---
+        dedup_hash = APIFetch._dedup_hash(entry.link)
+        image_url = APIFetch._extract_image_url(entry)
+        fingerprint = APIFetch._fingerprint(entry, image_url)
+        if known is not None and known.get(dedup_hash) == fingerprint:
+            print(f"  = Unchanged: {entry.get('title', '')[:60]}...")
+            return False
+
+        # --- Date Normalization ---
+        published_time = APIFetch._normalize_date(entry, date_cache)
+        
+        # --- Database Upsert ---
+        fields = {
+            'source': source,
+            'title': entry.get('title', 'No Title Provided'),
+            'url': entry.link,
+            'summary': entry.get('summary', ''),
+            'published_at': published_time,
+            'image_url': image_url,
+            'content_hash': fingerprint,
+        }
+        # The tier is only chosen on create; updates keep whatever the admin set,
+        # unless a replay asks for the tier rules again.
+        tiered = {**fields, 'tier': APIFetch._initial_tier(source)}
+        article, created = Article.objects.update_or_create(
+            hash=dedup_hash,
+            defaults=tiered if retier else fields,
+            create_defaults=tiered,
+        )
+
+        # --- Tags (feed categories and title keywords on the allow-list) and facet counts ---
+        tagger = tagger or tagging.Tagger()
+        tagger.apply(article, tagger.extract(entry), created)
+
+        if created:
+            # Pre-render the detail page so the first reader gets a cache hit.
+            detail_cache.warm(article)
+            print(f"  + Created: {article.title[:60]}...")
+        else:
+            print(f"  = Updated: {article.title[:60]}...")
+        return created
+
+    @staticmethod
+    def _initial_tier(source):
+        """Tier of a newly ingested article: "standard" for settings.STANDARD_SOURCES, else "free"."""
+        return "standard" if source.name in settings.STANDARD_SOURCES else "free"
+
+    @staticmethod
+    def _dedup_hash(link):
+        return hashlib.sha256(link.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _fingerprint(entry, image_url):
+        """Hash of the raw fields we store, used to spot entries that haven't changed."""
+        parts = (
+            entry.get('title', ''),
+            entry.link,
+            entry.get('summary', ''),
+            entry.get('published') or entry.get('updated') or '',
+            image_url or '',
+            ','.join(tag.get('term') or '' for tag in entry.get('tags', [])),
+        )
+        return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _known_fingerprints(entries):
+        hashes = [APIFetch._dedup_hash(entry.link) for entry in entries if hasattr(entry, 'link')]
+        return dict(Article.objects.filter(hash__in=hashes).values_list('hash', 'content_hash'))
+
+    @staticmethod
+    def _normalize_date(entry, date_cache=None):
+        """Returns the entry's publish time as an aware datetime (now() if unreadable)."""
+        # feedparser already parses the common RSS/Atom formats into a UTC struct_time.
+        parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+        if parsed:
+            return datetime(*parsed[:6], tzinfo=dt_timezone.utc)
+
+        raw = entry.get('published') or entry.get('updated')
+        if not raw:
+            return timezone.now()
+        if date_cache is not None and raw in date_cache:
+            return date_cache[raw] or timezone.now()
+
+        # Formats feedparser doesn't know: fall back to dateutil (imported only when needed).
+        from dateutil.parser import parse as parse_datetime
+
+        published_time = None
+        try:
+            dt = parse_datetime(raw)
+            if timezone.is_naive(dt):
+                # Assume the feed's timezone is the project's default timezone
+                published_time = timezone.make_aware(dt, timezone.get_default_timezone())
+            else:
+                # It's already aware, just use it
+                published_time = dt
+        except (TypeError, ValueError, OverflowError):
+            print(f"  ? Could not parse date: {raw}")
+
+        if date_cache is not None:
+            date_cache[raw] = published_time
+        return published_time or timezone.now()
+
+    @staticmethod
+    def _extract_image_url(entry):
+        """Returns the first image URL a feed entry carries, or None."""
+        # Media RSS first (most publishers), then plain RSS enclosures.
+        for media in entry.get('media_content', []) + entry.get('media_thumbnail', []):
+            url = media.get('url')
+            if url and media.get('medium', 'image') == 'image':
+                return url
+
+        for enclosure in entry.get('enclosures', []):
+            if enclosure.get('type', '').startswith('image/') and enclosure.get('href'):
+                return enclosure['href']
+
+        return None
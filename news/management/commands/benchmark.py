@@ -0,0 +1,123 @@
+"""
+Benchmark the site's hot paths against a synthetic, locally served corpus.
+
+Runs in a separate database (never the dev `db.sqlite3`):
+    python manage.py benchmark --articles 100000 --users 5000
+    python manage.py benchmark --save-baseline bench_baseline.json
+    python manage.py benchmark --compare bench_baseline.json --tolerance 0.25
+"""
+
+import platform
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from news import benchmark
+from ragtagnews import cache as two_level_cache
+
+
+class Command(BaseCommand):
+    help = "Seed a synthetic corpus and report latency/query percentiles for the hot paths."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sources", type=int, default=10)
+        parser.add_argument("--articles", type=int, default=100_000)
+        parser.add_argument("--users", type=int, default=2_000)
+        parser.add_argument("--reads-per-user", type=int, default=20)
+        parser.add_argument("--items-per-feed", type=int, default=20, help="Entries in each canned feed.")
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--only", nargs="*", help="Run only scenarios whose name starts with one of these.")
+        parser.add_argument("--keepdb", action="store_true", help="Reuse the seeded benchmark DB between runs.")
+        parser.add_argument("--save-baseline", metavar="PATH")
+        parser.add_argument("--compare", metavar="PATH", help="Fail if results regress against this baseline.")
+        parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 slowdown (0.2 = 20%%).")
+
+    def handle(self, *args, **opts):
+        # A file-backed DB so --keepdb can skip re-seeding a million rows.
+        test_settings = connection.settings_dict.setdefault("TEST", {})
+        if not test_settings.get("NAME"):
+            test_settings["NAME"] = str(settings.BASE_DIR / "bench.sqlite3")
+
+        # Likewise a cache of its own, so cached users/tiers never cross between the DBs.
+        bench_caches = {
+            "default": {**settings.CACHES["default"], "LOCATION": str(settings.BASE_DIR / ".cache-bench")},
+        }
+
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=opts["keepdb"])
+        caches_override = override_settings(CACHES=bench_caches)
+        caches_override.enable()
+        cache.clear()
+        two_level_cache.local.clear()
+        try:
+            with benchmark.FeedServer(opts["sources"], opts["items_per_feed"]) as server:
+                benchmark.seed(
+                    server,
+                    sources=opts["sources"],
+                    articles=opts["articles"],
+                    users=opts["users"],
+                    reads_per_user=opts["reads_per_user"],
+                    log=self.stdout.write,
+                )
+                feeds = [server.url(i) for i in range(opts["sources"])]
+                # Ingest archives feed bodies and publishes static feeds; keep the
+                # benchmark's out of the real ARCHIVE_ROOT and PUBLISH_ROOT.
+                with tempfile.TemporaryDirectory() as scratch, override_settings(
+                    FEEDS=feeds,
+                    ARCHIVE_ROOT=Path(scratch) / "archive",
+                    PUBLISH_ROOT=Path(scratch) / "published",
+                ):
+                    results = self._run(opts)
+        finally:
+            caches_override.disable()
+            two_level_cache.local.clear()
+            teardown_databases(old_config, verbosity=0, keepdb=opts["keepdb"])
+            teardown_test_environment()
+
+        self._report(results)
+
+        meta = {
+            "python": platform.python_version(),
+            "sources": opts["sources"],
+            "articles": opts["articles"],
+            "users": opts["users"],
+            "iterations": opts["iterations"],
+        }
+        if opts["save_baseline"]:
+            benchmark.save_baseline(opts["save_baseline"], results, meta)
+            self.stdout.write(f"\nBaseline written to {opts['save_baseline']}")
+        if opts["compare"]:
+            regressions = benchmark.compare_to_baseline(opts["compare"], results, opts["tolerance"])
+            if regressions:
+                raise CommandError("Performance regressions:\n  " + "\n  ".join(regressions))
+            self.stdout.write(self.style.SUCCESS("\nNo regressions against baseline."))
+
+    def _run(self, opts):
+        results = []
+        for name, func, iterations in benchmark.scenarios(opts["iterations"]):
+            if opts["only"] and not any(name.startswith(prefix) for prefix in opts["only"]):
+                continue
+            self.stdout.write(f"Running {name} x{iterations}...")
+            results.append(benchmark.measure(name, func, iterations))
+        return results
+
+    def _report(self, results):
+        header = f"\n{'scenario':<24}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}{'queries':>10}"
+        self.stdout.write(header)
+        self.stdout.write("-" * (len(header) - 1))
+        for r in results:
+            self.stdout.write(
+                f"{r.name:<24}{r.p50_ms:>10.2f}{r.p95_ms:>10.2f}{r.p99_ms:>10.2f}"
+                f"{r.throughput:>10.1f}{r.queries_mean:>10.1f}"
+            )
@@ -0,0 +1,90 @@
+"""
+Measure cold start of web workers and management commands with `python -X importtime`.
+
+Each target runs in fresh interpreters; the report shows median wall time and the
+heaviest imports. Fails when a target is over its STARTUP_BUDGET_MS or
+when a web worker imports one of STARTUP_DEFERRED_MODULES at boot.
+
+    python manage.py benchmark_startup
+    python manage.py benchmark_startup --runs 10 --top 15
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Worker targets import the WSGI/ASGI app and resolve the URLconf, i.e. everything a
+# worker needs before it can answer its first request.
+_WORKER_BOOT = (
+    "import ragtagnews.{module}; "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+
+TARGETS = {
+    "wsgi": [sys.executable, "-X", "importtime", "-c", _WORKER_BOOT.format(module="wsgi")],
+    "asgi": [sys.executable, "-X", "importtime", "-c", _WORKER_BOOT.format(module="asgi")],
+    "manage.py check": [sys.executable, "-X", "importtime", "manage.py", "check"],
+    "manage.py ingest_news --help": [sys.executable, "-X", "importtime", "manage.py", "ingest_news", "--help"],
+}
+WORKER_TARGETS = ("wsgi", "asgi")
+
+
+def _parse_importtime(stderr):
+    """Returns {module: cumulative_us} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules[name] = int(cumulative_us)
+    return modules
+
+
+class Command(BaseCommand):
+    help = "Report cold-start time and import cost for workers and manage.py commands."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--top", type=int, default=10, help="Heaviest imports to list per target.")
+        parser.add_argument("--only", nargs="*", choices=list(TARGETS), help="Targets to run.")
+
+    def handle(self, *args, **opts):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "ragtagnews.settings")}
+        budgets = settings.STARTUP_BUDGET_MS
+        failures = []
+
+        for name, argv in TARGETS.items():
+            if opts["only"] and name not in opts["only"]:
+                continue
+
+            walls, imports = [], {}
+            for _ in range(opts["runs"]):
+                t0 = time.perf_counter()
+                proc = subprocess.run(argv, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+                walls.append((time.perf_counter() - t0) * 1000)
+                if proc.returncode != 0:
+                    raise CommandError(f"{name} exited with {proc.returncode}:\n{proc.stderr[-2000:]}")
+                imports = _parse_importtime(proc.stderr)
+
+            wall_ms = statistics.median(walls)
+            top = sorted(imports.items(), key=lambda item: item[1], reverse=True)[: opts["top"]]
+            self.stdout.write(f"\n{name}: median {wall_ms:.0f} ms over {opts['runs']} runs")
+            for module, cumulative_us in top:
+                self.stdout.write(f"  {cumulative_us / 1000:>8.1f} ms  {module}")
+
+            budget = budgets.get(name)
+            if budget is not None and wall_ms > budget:
+                failures.append(f"{name}: {wall_ms:.0f} ms over budget of {budget} ms")
+            if name in WORKER_TARGETS:
+                leaked = sorted(m for m in settings.STARTUP_DEFERRED_MODULES if m in imports)
+                if leaked:
+                    failures.append(f"{name}: imports {', '.join(leaked)} at boot")
+
+        if failures:
+            raise CommandError("Startup budget exceeded:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS("\nAll targets within budget."))
@@ -0,0 +1,32 @@
+"""
+Write today's digest envelopes for every registered user to the outbox (see news/digests.py).
+
+    python manage.py build_digests
+    python manage.py build_digests --date 2025-10-19 --workers 4
+"""
+
+import os
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from news import digests
+
+
+class Command(BaseCommand):
+    help = "Render one digest per tier and write per-user envelopes to DIGEST_OUTBOX."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date", type=lambda value: datetime.strptime(value, "%Y-%m-%d").date(),
+            help="Digest day (YYYY-MM-DD); decides which subscriptions are active. Default: today.",
+        )
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Writer processes.")
+        parser.add_argument("--chunk-size", type=int, default=settings.DIGEST_CHUNK_SIZE)
+
+    def handle(self, *args, **opts):
+        counts = digests.build(
+            day=opts["date"], workers=opts["workers"], chunk_size=opts["chunk_size"], log=self.stdout.write
+        )
+        self.stdout.write(self.style.SUCCESS(f"Wrote {sum(counts.values())} digest(s) to {settings.DIGEST_OUTBOX}."))
@@ -0,0 +1,33 @@
+"""
+Stream the bulk tables to a directory of gzip JSON-lines files (see news/corpus.py).
+
+    python manage.py export_corpus backups/2025-10-19
+    python manage.py export_corpus backups/articles --model news.source --model news.article
+
+The export holds password hashes and payment records; store it like a database backup.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from news import corpus
+
+
+class Command(BaseCommand):
+    help = "Export sources, articles, tags, reads, users, subscriptions and payments in constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory")
+        parser.add_argument(
+            "--model", action="append", choices=corpus.MODELS, metavar="LABEL",
+            help=f"Model to export (repeatable). Default: {', '.join(corpus.MODELS)}.",
+        )
+
+    def handle(self, *args, **opts):
+        # Keep dependency order whatever order the flags came in.
+        labels = [label for label in corpus.MODELS if not opts["model"] or label in opts["model"]]
+        try:
+            manifest = corpus.export(opts["directory"], labels, log=self.stdout.write)
+        except OSError as e:
+            raise CommandError(e)
+        rows = sum(entry["rows"] for entry in manifest["models"])
+        self.stdout.write(self.style.SUCCESS(f"Exported {rows} rows to {opts['directory']}."))
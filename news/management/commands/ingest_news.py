@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from news import freshness
+from news.ingest import APIFetch
+
+
+class Command(BaseCommand):
+    help = "Fetch every enabled RSS source and upsert its articles."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--if-due", action="store_true",
+            help="Only ingest if the last run is older than TTL_MINUTES (for a frequent cron schedule).",
+        )
+
+    def handle(self, *args, **options):
+        if options["if_due"] and not freshness.ingest_due():
+            self.stdout.write("Content is fresh; nothing to do.")
+            return
+        APIFetch.GetContent()
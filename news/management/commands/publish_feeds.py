@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from ragtagnews.db_router import use_primary
+
+from news import publish
+
+
+class Command(BaseCommand):
+    help = "Regenerate the static RSS/Atom feeds and sitemaps (ingest does this after every cycle)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Rebuild every sitemap chunk, not just the newest.")
+
+    def handle(self, *args, **options):
+        with use_primary():
+            publish.publish(full=options["full"], log=self.stdout.write)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ragtagnews import cache
+
+from news import tagging
+
+
+class Command(BaseCommand):
+    help = "Recount Tag.article_count and Source.article_count from the stored rows."
+
+    def handle(self, *args, **options):
+        tagging.recount()
+        cache.bump("articles")
+        self.stdout.write(self.style.SUCCESS("Facet counts rebuilt."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ragtagnews import cache
+
+from news import headlines
+
+
+class Command(BaseCommand):
+    help = "Regenerate the Headline read model from Article, or (--check) report where it has drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Only compare; exit non-zero on any mismatch.")
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **opts):
+        if opts["check"]:
+            problems = headlines.check(batch_size=opts["batch_size"])
+            for kind, ids in problems.items():
+                if ids:
+                    sample = ", ".join(str(pk) for pk in ids[:10])
+                    self.stdout.write(f"  {kind}: {len(ids)} article(s), e.g. {sample}")
+            if any(problems.values()):
+                raise CommandError("Headlines are out of step with Article; run `manage.py rebuild_headlines`.")
+            self.stdout.write(self.style.SUCCESS("Headlines match Article."))
+            return
+
+        total = headlines.rebuild(batch_size=opts["batch_size"], log=self.stdout.write)
+        cache.bump("articles")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt headlines from {total} articles."))
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from news import rollups
+
+
+class Command(BaseCommand):
+    help = "Fold new ReadEvent rows into the daily read counters, then prune old raw rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.ROLLUP_BATCH_SIZE)
+        parser.add_argument(
+            "--keep-days", type=int, default=settings.READ_EVENT_RETENTION_DAYS,
+            help="Raw ReadEvent rows older than this are deleted once rolled up.",
+        )
+        parser.add_argument("--no-prune", action="store_true", help="Only roll up; keep every raw row.")
+
+    def handle(self, *args, **opts):
+        log = self.stdout.write
+        rolled = rollups.roll_up(batch_size=opts["batch_size"], log=log)
+        pruned = 0
+        if not opts["no_prune"]:
+            pruned = rollups.prune(keep_days=opts["keep_days"], batch_size=opts["batch_size"], log=log)
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {rolled} read events, pruned {pruned}."))
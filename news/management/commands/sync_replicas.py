@@ -0,0 +1,55 @@
+"""
+Refresh the SQLite read replicas (SQLITE_REPLICAS) from the primary.
+
+Each replica is written with SQLite's online backup API into a temp file and
+renamed into place, so readers see either the old snapshot or the new one.
+Connections are opened per request (CONN_MAX_AGE = 0), so the next request reads
+the new file. Run it from cron as often as replica lag allows:
+
+    python manage.py sync_replicas
+"""
+
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from ragtagnews import cache
+
+
+class Command(BaseCommand):
+    help = "Copy the SQLite primary into each read-only replica file."
+
+    def handle(self, *args, **options):
+        if not settings.SQLITE_REPLICA_FILES:
+            raise CommandError(
+                "No SQLite replicas configured (set SQLITE_REPLICAS). "
+                "PostgreSQL replicas are kept in sync by streaming replication."
+            )
+
+        primary = sqlite3.connect(connections["default"].settings_dict["NAME"])
+        try:
+            for alias, path in settings.SQLITE_REPLICA_FILES.items():
+                path = Path(path)
+                fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+                os.close(fd)
+                try:
+                    replica = sqlite3.connect(tmp_name)
+                    with replica:
+                        primary.backup(replica)
+                    replica.close()
+                    os.replace(tmp_name, path)
+                except BaseException:
+                    Path(tmp_name).unlink(missing_ok=True)
+                    raise
+                self.stdout.write(f"  {alias}: {path.name} refreshed")
+        finally:
+            primary.close()
+
+        # Pages cached while the replicas were behind would otherwise outlive the copy.
+        cache.bump("articles")
+        self.stdout.write(self.style.SUCCESS("Replicas refreshed."))
@@ -0,0 +1,81 @@
+"""
+news/metering.py
+
+Daily read metering for the detail page (see docs/Requirements.md §4.4):
+- anonymous: signed cookie "{count}:{YYYYMMDD}" in local time.
+- free/standard: ReadEvent rows, one per (user, article, local day).
+- premium: not counted, never walled.
+"""
+
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+
+from .models import ReadEvent
+
+COOKIE_NAME = "reads"
+COOKIE_SALT = "news.metering"
+
+
+@dataclass
+class Meter:
+    limit: int | None   # None = unmetered
+    used: int = 0
+    walled: bool = False
+    cookie: str | None = None  # new anonymous cookie value to send back
+
+    @property
+    def reads_left(self):
+        if self.limit is None:
+            return None
+        return max(0, self.limit - self.used)
+
+
+def read_limit(tier):
+    return settings.READS_PER_DAY.get(tier.lower())
+
+
+def meter_read(request, tier, article_id):
+    """Counts a detail view against today's quota and reports whether it hits the soft wall."""
+    limit = read_limit(tier)
+    if limit is None:
+        return Meter(limit=None)
+
+    today = timezone.localdate()
+
+    if tier == "anonymous":
+        used = 0
+        raw = request.get_signed_cookie(COOKIE_NAME, default="", salt=COOKIE_SALT)
+        count, _, day = raw.partition(":")
+        if day == today.strftime("%Y%m%d") and count.isdigit():
+            used = int(count)
+        if used >= limit:
+            return Meter(limit=limit, used=used, walled=True)
+        used += 1
+        return Meter(limit=limit, used=used, cookie=f"{used}:{today:%Y%m%d}")
+
+    # One small query answers both "how many today" and "is this a re-read".
+    read_today = set(
+        ReadEvent.objects.filter(user=request.user, date=today).values_list("article_id", flat=True)
+    )
+    if article_id in read_today:
+        return Meter(limit=limit, used=len(read_today))
+    if len(read_today) >= limit:
+        return Meter(limit=limit, used=len(read_today), walled=True)
+
+    try:
+        ReadEvent.objects.create(user=request.user, article_id=article_id, date=today)
+    except IntegrityError:
+        pass  # Same read recorded by a concurrent request (another tab).
+    return Meter(limit=limit, used=len(read_today) + 1)
+
+
+def apply(meter, response):
+    if meter.cookie is not None:
+        # Expires well after midnight; the date inside the value does the daily reset.
+        response.set_signed_cookie(
+            COOKIE_NAME, meter.cookie, salt=COOKIE_SALT, max_age=2 * 24 * 60 * 60, httponly=True, samesite="Lax"
+        )
+    return response
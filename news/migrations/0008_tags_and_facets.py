@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_source_counts(apps, schema_editor):
+    # Existing articles have no tags yet (ingest tags them); sources need their counts.
+    Article = apps.get_model("news", "Article")
+    Source = apps.get_model("news", "Source")
+    for source_id, n in Article.objects.values_list("source_id").annotate(n=Count("pk")).order_by():
+        Source.objects.filter(pk=source_id).update(article_count=n)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0007_article_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('article_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='article_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['source', '-published_at'], name='idx_article_source_pub'),
+        ),
+        migrations.AddField(
+            model_name='articletag',
+            name='article',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='article_tags', to='news.article'),
+        ),
+        migrations.AddField(
+            model_name='articletag',
+            name='tag',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='article_tags', to='news.tag'),
+        ),
+        migrations.AddIndex(
+            model_name='articletag',
+            index=models.Index(fields=['tag', '-published_at'], name='idx_articletag_tag_pub'),
+        ),
+        migrations.AddConstraint(
+            model_name='articletag',
+            constraint=models.UniqueConstraint(fields=('article', 'tag'), name='uq_article_tag'),
+        ),
+        migrations.RunPython(backfill_source_counts, migrations.RunPython.noop),
+    ]
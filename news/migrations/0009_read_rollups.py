@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:36
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0008_tags_and_facets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArticleDailyReads',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('reads', models.PositiveIntegerField(default=0)),
+                ('article', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='daily_reads', to='news.article')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'reads'], name='idx_article_reads_date')],
+                'constraints': [models.UniqueConstraint(fields=('article', 'date'), name='uq_article_reads_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SourceDailyReads',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('reads', models.PositiveIntegerField(default=0)),
+                ('source', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='daily_reads', to='news.source')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('source', 'date'), name='uq_source_reads_day')],
+            },
+        ),
+    ]
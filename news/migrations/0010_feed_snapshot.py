@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:42
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0009_read_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('digest', models.CharField(max_length=64)),
+                ('codec', models.CharField(max_length=4)),
+                ('size', models.PositiveIntegerField()),
+                ('content_type', models.CharField(blank=True, default='', max_length=200)),
+                ('source', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='news.source')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['source', '-fetched_at'], name='idx_snapshot_source_time')],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:54
+
+import hashlib
+from html import unescape
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+
+# Frozen copies of news.headlines / news.thumbnails as of this migration, so later
+# changes to those modules can't change what it writes.
+HIDDEN_TITLE_WORD = "sources"
+
+
+def excerpt(summary):
+    return Truncator(unescape(strip_tags(summary or ""))).words(30, truncate=" …")[:400]
+
+
+def thumbnail_key(image_url):
+    return hashlib.sha256(image_url.encode("utf-8")).hexdigest()[:32]
+
+
+def backfill_headlines(apps, schema_editor):
+    # Same rules as news.headlines.headline_for(), on the historical models.
+    Article = apps.get_model("news", "Article")
+    Headline = apps.get_model("news", "Headline")
+    rows = []
+    for article in Article.objects.select_related("source").order_by("pk").iterator(chunk_size=2000):
+        if HIDDEN_TITLE_WORD in article.title.lower():
+            continue
+        rows.append(Headline(
+            article_id=article.pk,
+            source_id=article.source_id,
+            source_name=article.source.name,
+            title=article.title,
+            tier=article.tier,
+            excerpt=excerpt(article.summary),
+            thumbnail_key=thumbnail_key(article.image_url) if article.image_url else "",
+            published_at=article.published_at,
+        ))
+        if len(rows) >= 2000:
+            Headline.objects.bulk_create(rows)
+            rows = []
+    Headline.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0010_feed_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Headline',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='headline', serialize=False, to='news.article')),
+                ('source_name', models.CharField(max_length=200)),
+                ('title', models.CharField(max_length=500)),
+                ('tier', models.CharField(choices=[('standard', 'Standard'), ('free', 'Free')], max_length=20)),
+                ('excerpt', models.CharField(blank=True, default='', max_length=400)),
+                ('thumbnail_key', models.CharField(blank=True, default='', max_length=32)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+                ('source', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='news.source')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-published_at', 'article', 'source', 'source_name', 'tier', 'thumbnail_key', 'title', 'excerpt'], name='idx_headline_list'), models.Index(fields=['source', '-published_at'], name='idx_headline_source_pub')],
+            },
+        ),
+        migrations.RunPython(backfill_headlines, migrations.RunPython.noop),
+    ]
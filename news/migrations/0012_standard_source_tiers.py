@@ -0,0 +1,29 @@
+from django.db import migrations
+
+# Frozen copy of settings.STANDARD_SOURCES as of this migration.
+STANDARD_SOURCES = ("techcrunch.com", "arstechnica.com")
+
+
+def retier_standard_sources(apps, schema_editor):
+    # The headlines view used to force these sources to "standard" on every request;
+    # ingest now does it once, on create. Apply it to the rows stored before that.
+    Article = apps.get_model("news", "Article")
+    Headline = apps.get_model("news", "Headline")
+    ids = list(
+        Article.objects.filter(source__name__in=STANDARD_SOURCES).exclude(tier="standard").values_list("pk", flat=True)
+    )
+    for start in range(0, len(ids), 500):
+        batch = ids[start:start + 500]
+        Article.objects.filter(pk__in=batch).update(tier="standard")
+        Headline.objects.filter(pk__in=batch).update(tier="standard")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0011_headline'),
+    ]
+
+    operations = [
+        migrations.RunPython(retier_standard_sources, migrations.RunPython.noop),
+    ]
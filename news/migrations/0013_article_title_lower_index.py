@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:15
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0012_standard_source_tiers'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(django.db.models.functions.text.Lower('title'), name='idx_article_title_lower'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+from django.db.models import Count, Exists, OuterRef
+
+
+def recount_listed(apps, schema_editor):
+    # Facet counts used to include hidden articles, and ingest tagged them too.
+    # Drop their tags and recount from the listed articles (the Headline rows).
+    ArticleTag = apps.get_model("news", "ArticleTag")
+    Headline = apps.get_model("news", "Headline")
+    Source = apps.get_model("news", "Source")
+    Tag = apps.get_model("news", "Tag")
+    ArticleTag.objects.exclude(Exists(Headline.objects.filter(pk=OuterRef("article_id")))).delete()
+    for model, rows, column in ((Tag, ArticleTag.objects, "tag_id"), (Source, Headline.objects, "source_id")):
+        model.objects.update(article_count=0)
+        for pk, n in rows.values_list(column).annotate(n=Count("pk")).order_by():
+            model.objects.filter(pk=pk).update(article_count=n)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0013_article_title_lower_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(recount_listed, migrations.RunPython.noop),
+    ]
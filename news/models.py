@@ -5,12 +5,19 @@ Lean data model for the class MVP:
 - Source 1..* Article
 - User 1..1 UserProfile  (tier: free | standard | premium)
 - User 1..* ReadEvent    (per-day metering for logged-in users)
+- Article *..* Tag       (through ArticleTag; tags come from feed categories at ingest)
+- ReadEvent -> ArticleDailyReads / SourceDailyReads (rollups, see news/rollups.py)
+- Source 1..* FeedSnapshot (index of the raw feed archive, see news/archive.py)
+- Article 1..1 Headline  (denormalized headline card, see news/headlines.py)
 """
 
 from django.conf import settings
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils import timezone
 
+from .thumbnails import thumbnail_key
+
 
 class Source(models.Model):
     #External content source (RSS for MVP).
@@ -28,6 +35,9 @@ class Source(models.Model):
     url = models.URLField(max_length=500)
     enabled = models.BooleanField(default=True)
 
+    # Rollup for the headline facets, kept by ingest and news/signals.py (see news/tagging.py).
+    article_count = models.PositiveIntegerField(default=0)
+
     class Meta:
         indexes = [
             models.Index(fields=["enabled"], name="idx_source_enabled"),
@@ -37,6 +47,28 @@ class Source(models.Model):
         return f"{self.name} ({self.type})"
 
 
+class FeedSnapshot(models.Model):
+    #One archived feed body per fetch whose bytes changed (files: news/archive.py).
+    #`reprocess_archive` replays these through the ingest pipeline.
+
+    source = models.ForeignKey(
+        Source, on_delete=models.CASCADE, related_name="snapshots", db_index=False
+    )
+    fetched_at = models.DateTimeField(default=timezone.now)
+    digest = models.CharField(max_length=64)  # sha256 of the body; also its file name
+    codec = models.CharField(max_length=4)    # "zst" or "gz"
+    size = models.PositiveIntegerField()      # uncompressed bytes
+    content_type = models.CharField(max_length=200, blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["source", "-fetched_at"], name="idx_snapshot_source_time"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.source_id} @ {self.fetched_at:%Y-%m-%d %H:%M}"
+
+
 class Article(models.Model):
     #Normalized article we list and link out to (snippet + external link).
     #JSON-like fields are stored as TEXT to stay SQLite-friendly.
@@ -57,16 +89,98 @@ class Article(models.Model):
 
     # Dedup key computed by the ingest command: sha256(canonical_link or link or title).
     hash = models.CharField(max_length=64, unique=True)
+    # sha256 of the raw feed fields we store; ingest skips entries whose fingerprint is unchanged.
+    content_hash = models.CharField(max_length=64, blank=True, default="")
 
     class Meta:
         indexes = [
             models.Index(fields=["-published_at"], name="idx_article_pub_desc"),
             models.Index(fields=["title"], name="idx_article_title"),
+            # Case-insensitive title prefix search in the admin (news/admin.py PrefixSearchMixin).
+            models.Index(Lower("title"), name="idx_article_title_lower"),
+            # Headlines filtered by source, newest first.
+            models.Index(fields=["source", "-published_at"], name="idx_article_source_pub"),
         ]
 
     def __str__(self) -> str:
         return self.title
 
+    @property
+    def thumbnail_key(self) -> str:
+        # Used by templates to build the immutable thumbnail URL.
+        return thumbnail_key(self.image_url) if self.image_url else ""
+
+
+class Headline(models.Model):
+    #Read model for the headlines page: one slim row per listed article, written by
+    #news/headlines.py. Everything a card shows is copied here, so a page never
+    #joins Source or reads Article's wide rows.
+
+    article = models.OneToOneField(
+        Article, on_delete=models.CASCADE, primary_key=True, related_name="headline"
+    )
+    # Filter only (source facet); the card shows source_name.
+    source = models.ForeignKey(Source, on_delete=models.CASCADE, related_name="+", db_index=False)
+    source_name = models.CharField(max_length=200)
+    title = models.CharField(max_length=500)
+    tier = models.CharField(max_length=20, choices=Article.TIER_CHOICES)
+    excerpt = models.CharField(max_length=400, blank=True, default="")  # plain text (EXCERPT_WORDS / EXCERPT_CHARS)
+    thumbnail_key = models.CharField(max_length=32, blank=True, default="")  # "" = no image
+    published_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Covering index for the unfiltered list: ordered by date and holding every
+            # column, so a page is read from the index alone.
+            models.Index(
+                fields=[
+                    "-published_at", "article", "source", "source_name",
+                    "tier", "thumbnail_key", "title", "excerpt",
+                ],
+                name="idx_headline_list",
+            ),
+            models.Index(fields=["source", "-published_at"], name="idx_headline_source_pub"),
+        ]
+
+    def __str__(self) -> str:
+        return self.title
+
+
+class Tag(models.Model):
+    #Normalized tag vocabulary (the keys of settings.TAG_ALLOWLIST).
+    #`article_count` is a rollup kept by ingest and news/signals.py for the headline facets.
+
+    name = models.CharField(max_length=64, unique=True)
+    article_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class ArticleTag(models.Model):
+    #Article <-> Tag link. `published_at` is copied from the article so
+    #"newest articles tagged X" is one range scan of idx_articletag_tag_pub.
+
+    # Both lookups are covered by the composite index/constraint below.
+    article = models.ForeignKey(
+        Article, on_delete=models.CASCADE, related_name="article_tags", db_index=False
+    )
+    tag = models.ForeignKey(
+        Tag, on_delete=models.CASCADE, related_name="article_tags", db_index=False
+    )
+    published_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["article", "tag"], name="uq_article_tag"),
+        ]
+        indexes = [
+            models.Index(fields=["tag", "-published_at"], name="idx_articletag_tag_pub"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.article_id} tagged {self.tag_id}"
+
 
 class ReadEvent(models.Model):
     #Logged-in metering record. One record per (user, article, local day).
@@ -96,3 +210,54 @@ class ReadEvent(models.Model):
 
     def __str__(self) -> str:
         return f"{self.user_id} read {self.article_id} on {self.date}"
+
+
+class ArticleDailyReads(models.Model):
+    #Rollup of ReadEvent: reads per (article, day). Filled by news/rollups.py.
+
+    article = models.ForeignKey(
+        Article, on_delete=models.CASCADE, related_name="daily_reads", db_index=False
+    )
+    date = models.DateField()
+    reads = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["article", "date"], name="uq_article_reads_day"),
+        ]
+        indexes = [
+            # Trending scans a date range; the admin lists days newest first, most read first.
+            models.Index(fields=["date", "reads"], name="idx_article_reads_date"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.article_id} read {self.reads}x on {self.date}"
+
+
+class SourceDailyReads(models.Model):
+    #Rollup of ReadEvent: reads per (source, day). Filled by news/rollups.py.
+
+    source = models.ForeignKey(
+        Source, on_delete=models.CASCADE, related_name="daily_reads", db_index=False
+    )
+    date = models.DateField()
+    reads = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["source", "date"], name="uq_source_reads_day"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.source_id} read {self.reads}x on {self.date}"
+
+
+class RollupState(models.Model):
+    #High-water mark per rollup: every row with id <= last_id has been folded in.
+
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self) -> str:
+        return f"{self.name} @ {self.last_id}"
@@ -0,0 +1,189 @@
+"""
+news/publish.py
+
+Static RSS/Atom feeds and sitemaps, regenerated after each ingest cycle.
+
+Everything is written under PUBLISH_ROOT (served at PUBLISH_URL by the web
+server, so crawlers and feed readers never reach Django):
+- feeds/all.{rss,atom}, feeds/source/<slug>.{rss,atom}, feeds/tier/<tier>.{rss,atom}
+  with the newest PUBLISH_FEED_ITEMS articles of each slice;
+- sitemap.xml, an index over sitemaps/articles-<n>.xml, each covering a fixed
+  range of SITEMAP_CHUNK_SIZE article ids, and a robots.txt pointing at it.
+
+Only listed articles (those with a Headline row, see news/headlines.py) are
+published, the same set the headlines page shows.
+
+Every file has a precompressed `.gz` twin and is written atomically (temp file +
+rename). manifest.json records each file's ETag (a hash of its bytes). A
+document whose bytes haven't changed is not rewritten, and a feed whose articles
+haven't changed is not even rendered. Sitemap chunks are rebuilt only when new
+ids land in them.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils import feedgenerator
+from django.utils.text import slugify
+
+from .models import Article, Source
+
+MANIFEST = "manifest.json"
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def source_slug(source_name):
+    return slugify(source_name.replace(".", "-"))
+
+
+def publish(full=False, log=print):
+    """Regenerates the feeds and sitemaps; `full` rebuilds every sitemap chunk. Returns files written."""
+    root = Path(settings.PUBLISH_ROOT)
+    manifest = {} if full else _load_manifest(root)
+    files = manifest.get("files", {})
+    produced, written = set(), []
+
+    def emit(relpath, data):
+        etag = '"%s"' % hashlib.sha256(data).hexdigest()[:32]
+        produced.add(relpath)
+        if files.get(relpath, {}).get("etag") == etag and (root / relpath).exists():
+            return
+        _write_atomic(root / relpath, data)
+        # mtime=0 keeps the .gz bytes stable for identical input.
+        _write_atomic(root / f"{relpath}.gz", gzip.compress(data, mtime=0))
+        files[relpath] = {"etag": etag, "bytes": len(data)}
+        written.append(relpath)
+
+    # --- Feeds ---
+    articles = Article.objects.filter(headline__isnull=False).select_related("source", "headline").order_by("-published_at")
+    slices = [("feeds/all", "All headlines", articles)]
+    for source in Source.objects.filter(enabled=True).order_by("name"):
+        slices.append((f"feeds/source/{source_slug(source.name)}", source.name, articles.filter(source=source)))
+    for tier, label in Article.TIER_CHOICES:
+        slices.append((f"feeds/tier/{tier}", f"{label} articles", articles.filter(tier=tier)))
+
+    for path, title, queryset in slices:
+        items = list(queryset[: settings.PUBLISH_FEED_ITEMS])
+        # Rendering is most of the cost; skip it when the slice holds the same revisions.
+        revision = hashlib.sha256(
+            "|".join(f"{a.pk}:{a.content_hash}:{a.tier}:{a.title}:{a.source.name}" for a in items).encode("utf-8")
+        ).hexdigest()[:32]
+        for suffix, feed_class in ((".rss", feedgenerator.Rss201rev2Feed), (".atom", feedgenerator.Atom1Feed)):
+            relpath = path + suffix
+            if files.get(relpath, {}).get("revision") == revision and (root / relpath).exists():
+                produced.add(relpath)
+                continue
+            emit(relpath, _render_feed(feed_class, path, title, items))
+            files[relpath]["revision"] = revision
+
+    # Feeds for sources that were disabled or renamed.
+    for relpath in [p for p in files if p.startswith("feeds/") and p not in produced]:
+        for stale in (root / relpath, root / f"{relpath}.gz"):
+            stale.unlink(missing_ok=True)
+        del files[relpath]
+
+    # --- Sitemaps ---
+    chunk_size = settings.SITEMAP_CHUNK_SIZE
+    last_id = Article.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+    published_id = manifest.get("sitemap_last_id", 0)
+    chunks = range(last_id // chunk_size + 1)
+    for n in chunks:
+        # A chunk only changes when new ids land in it (ids only grow).
+        if (last_id > published_id and n >= published_id // chunk_size) or f"sitemaps/articles-{n}.xml" not in files:
+            emit(f"sitemaps/articles-{n}.xml", _render_sitemap_chunk(n * chunk_size + 1, (n + 1) * chunk_size))
+    emit("sitemap.xml", _render_sitemap_index(f"sitemaps/articles-{n}.xml" for n in chunks))
+    emit("robots.txt", f"User-agent: *\nSitemap: {_absolute(settings.PUBLISH_URL + 'sitemap.xml')}\n".encode("utf-8"))
+
+    _write_atomic(
+        root / MANIFEST,
+        json.dumps({"files": files, "sitemap_last_id": last_id}, indent=1, sort_keys=True).encode("utf-8"),
+    )
+    log(f"Published {len(written)} changed file(s) under {root}.")
+    return written
+
+
+def _absolute(path):
+    return settings.SITE_URL.rstrip("/") + path
+
+
+def _render_feed(feed_class, path, title, items):
+    feed = feed_class(
+        title=f"The Egg - {title}",
+        link=_absolute(reverse("home")),
+        description=f"{title} from The Egg.",
+        feed_url=_absolute(settings.PUBLISH_URL + path + (".atom" if feed_class is feedgenerator.Atom1Feed else ".rss")),
+        language="en",
+    )
+    # The build date comes from the items, never the clock, so an unchanged feed keeps
+    # its bytes (and ETag) between runs.
+    dates = [article.published_at or article.ingested_at for article in items]
+    latest = max(dates, default=EPOCH)
+    feed.latest_post_date = lambda: latest
+
+    for article, date in zip(items, dates):
+        # Standard-tier summaries are for subscribers; the feed carries only the headline.
+        summary = article.headline.excerpt if article.tier == "free" else ""
+        feed.add_item(
+            title=article.title,
+            link=_absolute(reverse("article_detail", args=[article.pk])),
+            description=summary,
+            pubdate=date,
+            unique_id=article.hash,
+            categories=[article.source.name],
+        )
+    return feed.writeString("utf-8").encode("utf-8")
+
+
+def _render_sitemap_chunk(first_id, last_id):
+    rows = (
+        Article.objects.filter(pk__range=(first_id, last_id), headline__isnull=False)
+        .order_by("pk").values_list("pk", "ingested_at")
+    )
+    urls = "".join(
+        f"<url><loc>{escape(_absolute(reverse('article_detail', args=[pk])))}</loc>"
+        f"<lastmod>{ingested_at.date().isoformat()}</lastmod></url>"
+        for pk, ingested_at in rows
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+    ).encode("utf-8")
+
+
+def _render_sitemap_index(chunk_paths):
+    entries = "".join(
+        f"<sitemap><loc>{escape(_absolute(settings.PUBLISH_URL + path))}</loc></sitemap>" for path in chunk_paths
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>'
+    ).encode("utf-8")
+
+
+def _load_manifest(root):
+    try:
+        return json.loads((root / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_atomic(path, data):
+    # Temp file + rename, so the web server never serves a half-written document.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
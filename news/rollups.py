@@ -0,0 +1,135 @@
+"""
+news/rollups.py
+
+Read analytics without aggregating ReadEvent:
+- `roll_up()` folds new ReadEvent rows into ArticleDailyReads / SourceDailyReads in
+  id order, one batch per transaction, and records the last id it folded in
+  RollupState("reads"). Nothing is counted twice and nothing is re-read.
+- `prune()` deletes raw ReadEvent rows that are rolled up and older than
+  READ_EVENT_RETENTION_DAYS (metering only ever reads today's rows).
+- `trending()` ranks articles by reads over the last few days from the rollup.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from ragtagnews import cache
+from ragtagnews.db_router import use_primary
+
+from .models import Article, ArticleDailyReads, ReadEvent, RollupState, SourceDailyReads
+
+STATE_NAME = "reads"
+
+
+@use_primary()
+def roll_up(batch_size=None, log=print):
+    """Folds every settled ReadEvent past the high-water mark into the daily counters.
+
+    Returns the number of ReadEvent rows processed.
+    """
+    batch_size = batch_size or settings.ROLLUP_BATCH_SIZE
+    # Rows younger than the lag may still have lower-id siblings in flight; leave them for next run.
+    settled_before = timezone.now() - timedelta(seconds=settings.ROLLUP_LAG_SECONDS)
+    total = 0
+    while True:
+        with transaction.atomic():
+            state, _ = RollupState.objects.select_for_update().get_or_create(name=STATE_NAME)
+            rows = list(
+                ReadEvent.objects.filter(pk__gt=state.last_id)
+                .order_by("pk")
+                .values_list("pk", "article_id", "article__source_id", "date", "created_at")[:batch_size]
+            )
+            settled = []
+            for row in rows:
+                if row[4] >= settled_before:
+                    break
+                settled.append(row)
+            if not settled:
+                break
+
+            _add(ArticleDailyReads, "article_id", Counter((article_id, day) for _, article_id, _, day, _ in settled))
+            _add(SourceDailyReads, "source_id", Counter((source_id, day) for _, _, source_id, day, _ in settled))
+
+            state.last_id = settled[-1][0]
+            state.updated_at = timezone.now()
+            state.save(update_fields=["last_id", "updated_at"])
+
+        total += len(settled)
+        log(f"  rolled up {total} read events (through id {state.last_id})")
+        if len(settled) < len(rows) or len(rows) < batch_size:
+            break
+    return total
+
+
+def _add(model, key_field, counts):
+    """Adds `counts` {(key, date): n} onto the model's existing daily rows."""
+    keys = {key for key, _ in counts}
+    days = {day for _, day in counts}
+    existing = {
+        (getattr(row, key_field), row.date): row
+        for row in model.objects.filter(**{f"{key_field}__in": keys, "date__in": days})
+    }
+
+    changed, new = [], []
+    for (key, day), n in counts.items():
+        row = existing.get((key, day))
+        if row is None:
+            new.append(model(**{key_field: key, "date": day, "reads": n}))
+        else:
+            row.reads += n
+            changed.append(row)
+    model.objects.bulk_update(changed, ["reads"], batch_size=500)
+    model.objects.bulk_create(new, batch_size=500)
+
+
+def prune(keep_days=None, batch_size=None, log=print):
+    """Deletes rolled-up ReadEvent rows older than `keep_days`; returns how many."""
+    keep_days = settings.READ_EVENT_RETENTION_DAYS if keep_days is None else keep_days
+    batch_size = batch_size or settings.ROLLUP_BATCH_SIZE
+    last_id = RollupState.objects.filter(name=STATE_NAME).values_list("last_id", flat=True).first() or 0
+    old = ReadEvent.objects.filter(pk__lte=last_id, date__lt=timezone.localdate() - timedelta(days=keep_days))
+
+    # Small batches keep each write lock short; metering writes keep flowing in between.
+    total = 0
+    while True:
+        ids = list(old.order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return total
+        ReadEvent.objects.filter(pk__in=ids).delete()
+        total += len(ids)
+        log(f"  pruned {total} read events")
+
+
+def trending(days=None, limit=10):
+    """Most-read articles over the last `days` days, each with a `.reads` total."""
+    days = days or settings.TRENDING_DAYS
+    return cache.get_or_compute(
+        f"trending:{days}:{limit}", lambda: _trending(days, limit),
+        ttl=settings.TRENDING_CACHE_SECONDS, stale_ttl=settings.TRENDING_CACHE_SECONDS,
+    )
+
+
+def _trending(days, limit):
+    today = timezone.localdate()
+    # Listing the days (rather than date >= since) steers SQLite onto the date index
+    # instead of scanning the whole table in (article, date) order.
+    window = [today - timedelta(days=n) for n in range(days)]
+    top = list(
+        ArticleDailyReads.objects.filter(date__in=window)
+        .values_list("article_id")
+        .annotate(total=Sum("reads"))
+        .order_by("-total")[:limit]
+    )
+    articles = Article.objects.select_related("source").in_bulk([article_id for article_id, _ in top])
+    ranked = []
+    for article_id, total in top:
+        article = articles.get(article_id)
+        if article is not None:
+            article.reads = total
+            ranked.append(article)
+    return ranked
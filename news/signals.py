@@ -0,0 +1,50 @@
+"""
+news/signals.py
+
+Keeps cached headline and detail pages and the Headline read model in step with
+ingest, admin edits and other saves, and the facet counts in step with deletes
+(ingest counts additions itself).
+(Bulk `queryset.update()` calls skip signals and must invalidate themselves.)
+"""
+
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ragtagnews import cache
+
+from . import detail_cache, headlines
+from .models import Article, ArticleTag, Headline, Source, Tag
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def invalidate_article_detail(sender, instance, **kwargs):
+    detail_cache.invalidate([instance.pk])
+    cache.bump("articles")  # headline pages
+
+
+@receiver(post_save, sender=Article)
+def sync_headline(sender, instance, **kwargs):
+    headlines.sync([instance])
+
+
+@receiver(post_save, sender=Source)
+def invalidate_source_articles(sender, instance, created, **kwargs):
+    # Detail bodies and headline cards show the source name.
+    if not created:
+        Headline.objects.filter(source=instance).exclude(source_name=instance.name).update(source_name=instance.name)
+        detail_cache.invalidate(instance.articles.values_list("pk", flat=True))
+        cache.bump("articles")
+
+
+@receiver(post_delete, sender=Article)
+def uncount_article(sender, instance, **kwargs):
+    # Facet counts cover listed articles only (news/tagging.py).
+    if headlines.is_listed(instance):
+        Source.objects.filter(pk=instance.source_id, article_count__gt=0).update(article_count=F("article_count") - 1)
+
+
+@receiver(post_delete, sender=ArticleTag)
+def uncount_article_tag(sender, instance, **kwargs):
+    Tag.objects.filter(pk=instance.tag_id, article_count__gt=0).update(article_count=F("article_count") - 1)
@@ -0,0 +1,100 @@
+"""
+news/tagging.py
+
+Ingest-time tagging and the facet rollups.
+
+- Feed categories (`entry.tags`) and keywords in the title are mapped onto the
+  TAG_ALLOWLIST vocabulary; anything not on the list is dropped, so the Tag
+  table stays small no matter what publishers put in their feeds.
+- Tags are stored as ArticleTag rows carrying the article's `published_at`.
+  Hidden articles (see news/headlines.py `is_listed`) get no tags.
+- `Tag.article_count` and `Source.article_count` count listed articles only, the
+  ones the headlines page shows. They are kept in step as rows come and go, so the
+  facet counts never GROUP BY articles. An update that moves a stored article
+  between listed and hidden fixes its tags but not its source's count;
+  `recount()` rebuilds everything from scratch (`manage.py rebuild_facets`).
+"""
+
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef
+
+from ragtagnews.db_router import use_primary
+
+from . import headlines
+from .models import ArticleTag, Headline, Source, Tag
+
+
+def _normalize(text):
+    return " ".join(text.lower().split())
+
+
+class Tagger:
+    """Extracts and stores tags for one ingest cycle (caches the tag ids it has seen)."""
+
+    def __init__(self):
+        self.aliases = {
+            _normalize(alias): tag
+            for tag, aliases in settings.TAG_ALLOWLIST.items()
+            for alias in (tag, *aliases)
+        }
+        # Longest alias first, so "machine learning" wins over "machine".
+        alternatives = sorted(map(re.escape, self.aliases), key=len, reverse=True)
+        self.keywords = re.compile(r"\b(?:%s)\b" % "|".join(alternatives), re.IGNORECASE) if alternatives else None
+        self._tag_ids = {}
+
+    def extract(self, entry):
+        """Returns the allow-listed tag names for a feed entry, categories first."""
+        names = []
+        terms = [category.get("term") or category.get("label") or "" for category in entry.get("tags", [])]
+        if self.keywords is not None:
+            terms += self.keywords.findall(entry.get("title", ""))
+        for term in terms:
+            name = self.aliases.get(_normalize(term))
+            if name and name not in names:
+                names.append(name)
+        return names[: settings.MAX_TAGS_PER_ARTICLE]
+
+    def apply(self, article, names, created):
+        """Makes `names` the article's tags and updates the tag and source counts."""
+        listed = headlines.is_listed(article)
+        if created and listed:
+            Source.objects.filter(pk=article.source_id).update(article_count=F("article_count") + 1)
+        wanted = {self._tag_id(name) for name in names} if listed else set()
+        current = {} if created else dict(
+            ArticleTag.objects.filter(article=article).values_list("tag_id", "published_at")
+        )
+
+        removed = current.keys() - wanted
+        if removed:
+            # news/signals.py decrements the counts for deleted links.
+            ArticleTag.objects.filter(article=article, tag_id__in=removed).delete()
+        if any(current[tag_id] != article.published_at for tag_id in current.keys() & wanted):
+            ArticleTag.objects.filter(article=article).update(published_at=article.published_at)
+
+        added = wanted - current.keys()
+        if added:
+            ArticleTag.objects.bulk_create(
+                ArticleTag(article=article, tag_id=tag_id, published_at=article.published_at)
+                for tag_id in added
+            )
+            Tag.objects.filter(pk__in=added).update(article_count=F("article_count") + 1)
+
+    def _tag_id(self, name):
+        if name not in self._tag_ids:
+            self._tag_ids[name] = Tag.objects.get_or_create(name=name)[0].pk
+        return self._tag_ids[name]
+
+
+@use_primary()
+def recount():
+    """Recomputes every facet count from the link and article tables (an offline job)."""
+    with transaction.atomic():
+        # Headline holds exactly the listed articles.
+        listed_tags = ArticleTag.objects.filter(Exists(Headline.objects.filter(pk=OuterRef("article_id"))))
+        for model, rows, column in ((Tag, listed_tags, "tag_id"), (Source, Headline.objects, "source_id")):
+            model.objects.update(article_count=0)
+            for pk, n in rows.values_list(column).annotate(n=Count("pk")).order_by():
+                model.objects.filter(pk=pk).update(article_count=n)
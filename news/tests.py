@@ -1,3 +1,765 @@
-from django.test import TestCase
+import mailbox
+import shutil
+import socket
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from email.utils import parsedate_to_datetime
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache as shared
+from django.contrib.admin.sites import site as admin_site
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from Profile.models import Profile, Subscription
+from ragtagnews import cache, db_router
+
+from . import corpus, detail_cache, digests, freshness, headlines, publish, rollups, thumbnails
+from .admin import EstimatedCountPaginator
+from .models import (
+    Article, ArticleDailyReads, ArticleTag, Headline, ReadEvent, RollupState, Source, SourceDailyReads, Tag,
+)
+from .thumbnails import ThumbnailError
+
+
+def _article(source, n, **fields):
+    """Creates an article through save(), so the signals keep Headline and the caches in step."""
+    fields = {
+        "title": f"Headline {n}",
+        "url": f"https://example.com/{n}",
+        "summary": f"<p>Summary {n}</p>",
+        "published_at": timezone.now(),
+        "tier": "free",
+        "hash": f"{n:064d}",
+        **fields,
+    }
+    return Article.objects.create(source=source, **fields)
+
+
+def _entry(n, title, **fields):
+    """A parsed feed entry linking to https://example.com/<n>."""
+    import feedparser
+
+    return feedparser.FeedParserDict(link=f"https://example.com/{n}", title=title, summary="Body", **fields)
+
+
+def _ingest(source, entry, **options):
+    """Runs `entry` through ingest as a one-entry feed, quietly; returns the stored article."""
+    import feedparser
+
+    from .ingest import APIFetch
+
+    with redirect_stdout(StringIO()):
+        APIFetch._process_feed(source, feedparser.FeedParserDict(bozo=False, entries=[entry]), **options)
+    return Article.objects.get(url=entry.link)
+
+
+def _reader(username, tier=None):
+    """A user with a profile and, for tier="Standard", an active subscription."""
+    profile = Profile.objects.create(user=User.objects.create(username=username))
+    if tier:
+        Subscription.objects.create(
+            user_id=profile, tier=tier, start_date=date.today(), end_date=date.today() + timedelta(days=30),
+        )
+    return profile.user
+
+
+def _temp_dir(test):
+    path = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+
+def _png(width, height):
+    from PIL import Image
+
+    out = BytesIO()
+    Image.new("RGB", (width, height), "white").save(out, format="PNG")
+    return out.getvalue()
+
+
+class ThumbnailTests(SimpleTestCase):
+    """Publisher image URLs are untrusted: only public hosts, bounded images, failures remembered."""
+
+    def setUp(self):
+        settings_override = override_settings(THUMBNAIL_ROOT=_temp_dir(self))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        shared.clear()
+
+    def test_non_public_addresses_are_refused(self):
+        for url in (
+            "http://127.0.0.1/a.jpg",
+            "http://10.1.2.3/a.jpg",
+            "http://192.168.0.10/a.jpg",
+            "http://169.254.169.254/latest/meta-data/",
+            "http://[::1]/a.jpg",
+            "http://[::ffff:127.0.0.1]/a.jpg",
+            "file:///etc/passwd",
+        ):
+            with self.subTest(url=url), self.assertRaises(ThumbnailError):
+                thumbnails._check_public(url)
+
+    def test_redirect_hops_are_checked(self):
+        redirect = mock.MagicMock(is_redirect=True, headers={"Location": "http://127.0.0.1/admin"})
+        redirect.__enter__.return_value = redirect
+        with mock.patch("requests.Session.get", return_value=redirect) as get:
+            with self.assertRaisesMessage(ThumbnailError, "not a public address"):
+                thumbnails._fetch("http://93.184.216.34/a.jpg")
+        self.assertEqual(get.call_count, 1)
+        self.assertFalse(get.call_args.kwargs["allow_redirects"])
+
+    def test_connection_goes_to_the_checked_address(self):
+        # A rebinding host answers with a public address for the check, then loopback.
+        answers = iter(["93.184.216.34", "127.0.0.1"])
+        connected = []
+
+        def getaddrinfo(host, port, *args, **kwargs):
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (next(answers), 80))]
+
+        def create_connection(address, *args, **kwargs):
+            connected.append(address)
+            raise OSError("stop here")
+
+        with mock.patch("socket.getaddrinfo", side_effect=getaddrinfo), \
+                mock.patch("urllib3.util.connection.create_connection", side_effect=create_connection):
+            with self.assertRaisesMessage(ThumbnailError, "Could not fetch image"):
+                thumbnails._fetch("http://images.example/a.jpg")
+        self.assertEqual(connected, [("93.184.216.34", 80)])
+
+    def test_pinned_requests_keep_the_host_name(self):
+        self.assertEqual(
+            thumbnails._pinned("https://images.example:8443/a.jpg?w=1", "2606:2800:220:1::1"),
+            ("https://[2606:2800:220:1::1]:8443/a.jpg?w=1", {"Host": "images.example:8443"}),
+        )
+        pool_kw = thumbnails._session("images.example").get_adapter("https://").poolmanager.connection_pool_kw
+        self.assertEqual((pool_kw["server_hostname"], pool_kw["assert_hostname"]), ("images.example",) * 2)
+
+    @override_settings(THUMBNAIL_MAX_PIXELS=100 * 100)
+    def test_oversized_image_is_refused_once(self):
+        with mock.patch.object(thumbnails, "_fetch", return_value=_png(200, 200)) as fetch:
+            for _ in range(2):
+                with self.assertRaises(ThumbnailError):
+                    thumbnails.build_thumbnail("https://example.com/huge.png", "card")
+        self.assertEqual(fetch.call_count, 1)  # the second attempt hit the cached failure
+
+    def test_decompression_bomb_is_a_thumbnail_error(self):
+        from PIL import Image
+
+        with mock.patch.object(Image, "MAX_IMAGE_PIXELS", 1000):
+            with self.assertRaises(ThumbnailError):
+                thumbnails._resize(_png(200, 200), (40, 20))
+
+    def test_builds_and_reuses_the_file(self):
+        with mock.patch.object(thumbnails, "_fetch", return_value=_png(200, 200)) as fetch:
+            path = thumbnails.build_thumbnail("https://example.com/ok.png", "card")
+            self.assertEqual(thumbnails.build_thumbnail("https://example.com/ok.png", "card"), path)
+        self.assertTrue(path.exists())
+        self.assertEqual(fetch.call_count, 1)
+
+
+class IngestTierTests(TestCase):
+    """Ingest picks the tier when it creates an article and leaves it alone afterwards."""
+
+    def test_standard_sources_start_as_standard(self):
+        source = Source.objects.create(name="techcrunch.com", url="https://techcrunch.com/feed/")
+        self.assertEqual(_ingest(source, _entry(1, "Launch")).tier, "standard")
+
+    def test_other_sources_start_as_free(self):
+        source = Source.objects.create(name="example.com", url="https://example.com/feed/")
+        self.assertEqual(_ingest(source, _entry(1, "Launch")).tier, "free")
+
+    def test_update_keeps_the_admin_tier(self):
+        source = Source.objects.create(name="example.com", url="https://example.com/feed/")
+        article = _ingest(source, _entry(1, "Launch"))
+        Article.objects.filter(pk=article.pk).update(tier="standard")
+
+        article = _ingest(source, _entry(1, "Launch, updated"))
+        self.assertEqual(article.title, "Launch, updated")
+        self.assertEqual(article.tier, "standard")
+
+    def test_replay_keeps_the_admin_tier_unless_retiering(self):
+        source = Source.objects.create(name="techcrunch.com", url="https://techcrunch.com/feed/")
+        article = _ingest(source, _entry(1, "Launch"))
+        Article.objects.filter(pk=article.pk).update(tier="free")
+
+        self.assertEqual(_ingest(source, _entry(1, "Launch"), force=True).tier, "free")
+        self.assertEqual(_ingest(source, _entry(1, "Launch"), retier=True).tier, "standard")
+
+
+class IngestFastPathTests(TestCase):
+    """Unchanged entries cost nothing; dates come from feedparser, with a cached dateutil fallback."""
+
+    def setUp(self):
+        self.source = Source.objects.create(name="example.com", url="https://example.com/feed/")
+
+    def test_unchanged_entry_is_skipped_before_parsing_or_writes(self):
+        entry = _entry(1, "Launch", published="sometime last week")
+        _ingest(self.source, entry)
+
+        with mock.patch("dateutil.parser.parse") as parse, CaptureQueriesContext(connection) as queries:
+            _ingest(self.source, entry)
+        parse.assert_not_called()
+        statements = [query["sql"] for query in queries.captured_queries]
+        self.assertEqual(len(statements), 2)  # the fingerprint lookup, then the helper's own get()
+        self.assertTrue(all(sql.startswith("SELECT") for sql in statements))
+
+    def test_published_parsed_wins(self):
+        from .ingest import APIFetch
+
+        entry = _entry(1, "Launch", published="not a date", published_parsed=time.gmtime(1_700_000_000))
+        with mock.patch("dateutil.parser.parse") as parse:
+            published = APIFetch._normalize_date(entry)
+        parse.assert_not_called()
+        self.assertEqual(published, datetime.fromtimestamp(1_700_000_000, tz=dt_timezone.utc))
+
+    def test_dateutil_fallback_is_cached_per_cycle(self):
+        from dateutil import parser
+
+        from .ingest import APIFetch
+
+        entry = _entry(1, "Launch", published="Oct 1 2025 12:00")
+        date_cache = {}
+        with mock.patch("dateutil.parser.parse", wraps=parser.parse) as parse:
+            first = APIFetch._normalize_date(entry, date_cache)
+            second = APIFetch._normalize_date(entry, date_cache)
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(first, timezone.make_aware(datetime(2025, 10, 1, 12, 0)))
+        self.assertEqual(date_cache, {"Oct 1 2025 12:00": first})
+
+    def test_changed_entry_is_rewritten(self):
+        article = _ingest(self.source, _entry(1, "Launch"))
+        updated = _ingest(self.source, _entry(1, "Launch, updated"))
+        self.assertEqual(updated.pk, article.pk)
+        self.assertEqual(updated.title, "Launch, updated")
+        self.assertNotEqual(updated.content_hash, article.content_hash)
+
+
+class FacetCountTests(TestCase):
+    """Source and tag counts cover the listed articles only, the ones the headlines page shows."""
+
+    def setUp(self):
+        self.source = Source.objects.create(name="example.com", url="https://example.com/feed/")
+
+    def assertCounts(self, source, tag):
+        self.source.refresh_from_db()
+        self.assertEqual(self.source.article_count, source)
+        self.assertEqual(Tag.objects.get(name="apple").article_count, tag)
+
+    def test_hidden_articles_are_not_counted(self):
+        _ingest(self.source, _entry(1, "New iPhone ships"))
+        hidden = _ingest(self.source, _entry(2, "iPhone delayed, sources say"))
+        self.assertCounts(source=1, tag=1)
+        self.assertFalse(ArticleTag.objects.filter(article=hidden).exists())
+
+        hidden.delete()
+        self.assertCounts(source=1, tag=1)
+
+    def test_hiding_an_article_drops_its_tags(self):
+        _ingest(self.source, _entry(1, "New iPhone ships"))
+        _ingest(self.source, _entry(1, "New iPhone ships, sources say"))
+        self.assertCounts(source=1, tag=0)  # the source count waits for rebuild_facets
+
+        call_command("rebuild_facets", stdout=StringIO())
+        self.assertCounts(source=0, tag=0)
+
+    def test_rebuild_facets_recounts_listed_articles(self):
+        _ingest(self.source, _entry(1, "New iPhone ships"))
+        _ingest(self.source, _entry(2, "iPad refresh"))
+        hidden = _article(self.source, 3, title="Sources: iPhone fold")
+        ArticleTag.objects.create(article=hidden, tag=Tag.objects.get(name="apple"), published_at=hidden.published_at)
+        Source.objects.update(article_count=7)
+        Tag.objects.update(article_count=7)
+
+        call_command("rebuild_facets", stdout=StringIO())
+        self.assertCounts(source=2, tag=2)
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"], REPLICA_STICKY_SECONDS=90)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Content reads go to a replica unless there is none yet or the browser just wrote."""
+
+    def setUp(self):
+        self.snapshot = Path(_temp_dir(self)) / "db-replica1.sqlite3"
+        self.snapshot.touch()
+        settings_override = override_settings(SQLITE_REPLICA_FILES={"replica1": self.snapshot})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        ready = mock.patch.object(db_router, "_ready", set())
+        ready.start()
+        self.addCleanup(ready.stop)
+        self.router = db_router.PrimaryReplicaRouter()
+
+    def serve(self, *writes, model=Article, cookies=None, read=None):
+        """Runs one request that writes `writes` and then reads `model`; returns (alias, response).
+
+        `read`, if given, does the reading instead and returns the alias it saw.
+        """
+        aliases = []
+
+        def view(request):
+            for written in writes:
+                self.router.db_for_write(written)
+            aliases.append(read() if read else self.router.db_for_read(model))
+            return HttpResponse()
+
+        request = RequestFactory().get("/")
+        request.COOKIES.update(cookies or {})
+        response = db_router.ReplicaPinningMiddleware(view)(request)
+        return aliases[0], response
+
+    def test_content_reads_use_the_replica(self):
+        self.assertEqual(self.serve()[0], "replica1")
+        self.assertEqual(self.serve(model=Profile)[0], "default")
+
+    def test_detail_misses_render_from_the_primary(self):
+        # An invalidated entry must not be re-cached from a lagging replica.
+        shared.clear()
+        cache.local.clear()
+        aliases = []
+        with mock.patch.object(detail_cache, "Article") as article_model:
+            rows = article_model.objects.select_related.return_value.filter.return_value
+            rows.first.side_effect = lambda: aliases.append(self.router.db_for_read(Article))
+            self.serve(read=lambda: detail_cache.get_detail(1))
+        self.assertEqual(aliases, ["default"])
+
+    def test_missing_snapshot_falls_back_to_the_primary(self):
+        self.snapshot.unlink()
+        self.assertEqual(self.serve()[0], "default")
+        self.snapshot.touch()  # the first sync_replicas
+        self.assertEqual(self.serve()[0], "replica1")
+
+    def test_write_pins_the_request_and_the_browser(self):
+        alias, response = self.serve(Source)
+        self.assertEqual(alias, "default")
+        self.assertEqual(response.cookies[db_router.PIN_COOKIE]["max-age"], 90)
+        self.assertEqual(self.serve(cookies={db_router.PIN_COOKIE: "1"})[0], "default")
+
+    def test_metering_writes_do_not_pin(self):
+        alias, response = self.serve(ReadEvent)
+        self.assertEqual(alias, "replica1")
+        self.assertNotIn(db_router.PIN_COOKIE, response.cookies)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        alias, response = self.serve(Source)
+        self.assertEqual(alias, "default")
+        self.assertNotIn(db_router.PIN_COOKIE, response.cookies)
+
+
+class HeadlineModelTests(TestCase):
+    """Every way an article changes keeps its Headline row in step; --check reports drift."""
+
+    def setUp(self):
+        self.source = Source.objects.create(name="example.com", url="https://example.com/feed/")
+        self.article = _article(self.source, 1, title="Chip launch")
+
+    def assertInStep(self):
+        self.assertEqual(headlines.check(), {"missing": [], "extra": [], "stale": []})
+
+    def test_article_save(self):
+        self.article.title = "Chip launch delayed"
+        self.article.save()
+        self.assertEqual(Headline.objects.get(pk=self.article.pk).title, "Chip launch delayed")
+        self.assertInStep()
+
+    def test_source_rename(self):
+        self.source.name = "example.org"
+        self.source.save()
+        self.assertEqual(Headline.objects.get(pk=self.article.pk).source_name, "example.org")
+        self.assertInStep()
+
+    def test_admin_tier_action(self):
+        model_admin = admin_site._registry[Article]
+        with mock.patch.object(model_admin, "message_user"):
+            model_admin.make_standard(RequestFactory().post("/"), Article.objects.all())
+        self.assertEqual(Headline.objects.get(pk=self.article.pk).tier, "standard")
+        self.assertInStep()
+
+    def test_hiding_a_title_drops_the_row(self):
+        self.article.title = "Chip launch slips, sources say"
+        self.article.save()
+        self.assertFalse(Headline.objects.filter(pk=self.article.pk).exists())
+        self.assertInStep()
+
+    def test_check_reports_drift_and_rebuild_repairs_it(self):
+        extra = _article(self.source, 2)
+        stale = _article(self.source, 3)
+        # update() skips the signals, so these leave the read model behind.
+        Headline.objects.filter(pk=self.article.pk).delete()
+        Article.objects.filter(pk=extra.pk).update(title="Anonymous sources say")
+        Headline.objects.filter(pk=stale.pk).update(title="Old title")
+
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command("rebuild_headlines", "--check", stdout=out)
+        report = out.getvalue()
+        self.assertIn(f"missing: 1 article(s), e.g. {self.article.pk}", report)
+        self.assertIn(f"extra: 1 article(s), e.g. {extra.pk}", report)
+        self.assertIn(f"stale: 1 article(s), e.g. {stale.pk}", report)
+
+        call_command("rebuild_headlines", stdout=StringIO())
+        call_command("rebuild_headlines", "--check", stdout=StringIO())
+        self.assertInStep()
+
+
+class PublishTests(TestCase):
+    """Static feeds and sitemaps carry the same articles as the headlines page."""
+
+    def test_hidden_articles_are_not_published(self):
+        source = Source.objects.create(name="example.com", url="https://example.com/feed/")
+        listed = _article(source, 1, title="Chip launch")
+        hidden = _article(source, 2, title="Anonymous sources say")
+        root = _temp_dir(self)
+
+        with override_settings(PUBLISH_ROOT=root):
+            publish.publish(full=True, log=lambda *args: None)
+
+        with open(f"{root}/feeds/all.rss", encoding="utf-8") as feed:
+            rss = feed.read()
+        self.assertIn(listed.title, rss)
+        self.assertNotIn(hidden.title, rss)
+        with open(f"{root}/sitemaps/articles-0.xml", encoding="utf-8") as sitemap:
+            urls = sitemap.read()
+        self.assertIn(f"/article/{listed.pk}/", urls)
+        self.assertNotIn(f"/article/{hidden.pk}/", urls)
+
+
+class CorpusTests(TestCase):
+    """export_corpus reads without a transaction; import_corpus replaces what the caches describe."""
+
+    LABELS = ("news.source", "news.article")
+
+    def setUp(self):
+        shared.clear()
+        cache.local.clear()
+        self.source = Source.objects.create(name="example.com", url="https://example.com/feed/")
+        self.article = _article(self.source, 1, title="Chip launch")
+        self.directory = _temp_dir(self)
+
+    def export(self, log=lambda *args: None):
+        return corpus.export(self.directory, labels=self.LABELS, log=log)
+
+    def test_rows_added_during_the_export_are_left_out(self):
+        def log(line):
+            if line.startswith("  news.source"):
+                _article(self.source, 2)
+
+        manifest = self.export(log)
+        self.assertEqual([entry["rows"] for entry in manifest["models"]], [1, 1])
+
+    def test_import_invalidates_cached_detail_bodies(self):
+        self.export()
+        Article.objects.all().delete()
+        Source.objects.all().delete()
+        self.article.title = "Old contents"
+        detail_cache.warm(self.article)  # cached before the tables were emptied
+
+        with override_settings(PUBLISH_ROOT=_temp_dir(self)):
+            call_command("import_corpus", self.directory, stdout=StringIO())
+        self.assertEqual(detail_cache.get_detail(self.article.pk)["title"], "Chip launch")
+
+
+class DigestTests(TestCase):
+    """build_digests renders once per tier and writes one envelope per active user with an email."""
+
+    @classmethod
+    def setUpTestData(cls):
+        source = Source.objects.create(name="example.com", url="https://example.com/feed/")
+        _article(source, 1, title="Chip launch")
+        today = date.today()
+        for n in range(5):
+            profile = Profile.objects.create(user=User.objects.create(username=f"reader{n}", email=f"r{n}@example.com"))
+            if n < 2:
+                Subscription.objects.create(
+                    user_id=profile, tier="Standard", start_date=today - timedelta(days=1), end_date=today + timedelta(days=9),
+                )
+        # Skipped: no email, inactive.
+        Profile.objects.create(user=User.objects.create(username="no-email"))
+        Profile.objects.create(user=User.objects.create(username="gone", email="gone@example.com", is_active=False))
+
+    def setUp(self):
+        self.outbox = _temp_dir(self)
+        settings_override = override_settings(DIGEST_OUTBOX=self.outbox)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _build(self, chunk_size):
+        return digests.build(workers=1, chunk_size=chunk_size, log=lambda *args: None)
+
+    def _messages(self):
+        day_dir = f"{self.outbox}/{date.today().isoformat()}"
+        return {
+            message["To"]: message
+            for path in sorted(Path(day_dir).glob("*.mbox"))
+            for message in mailbox.mbox(str(path))
+        }
+
+    def test_groups_recipients_by_tier(self):
+        self.assertEqual(self._build(chunk_size=2), {"free": 3, "standard": 2})
+        messages = self._messages()
+        self.assertEqual(len(messages), 5)
+        self.assertNotIn("gone@example.com", " ".join(messages))
+        self.assertIn("Chip launch", messages["reader0 <r0@example.com>"].as_string())
+
+    def test_date_is_the_send_time(self):
+        before = timezone.now().replace(microsecond=0)
+        self._build(chunk_size=10)
+        for message in self._messages().values():
+            self.assertGreaterEqual(parsedate_to_datetime(message["Date"]), before)
+
+    def test_rerun_replaces_previous_chunks(self):
+        self._build(chunk_size=1)
+        first = self._messages()
+        self._build(chunk_size=10)
+        second = self._messages()
+        self.assertEqual(len(list(Path(self.outbox).glob("*/*.mbox"))), 2)
+        self.assertEqual(
+            {to: m["Message-ID"] for to, m in first.items()}, {to: m["Message-ID"] for to, m in second.items()}
+        )
+
+
+class RollupTests(TestCase):
+    """roll_up() folds each settled ReadEvent once; prune() only deletes what it has folded."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.source = Source.objects.create(name="example.com", url="https://example.com/feed/")
+        cls.article = _article(cls.source, 1)
+        cls.users = [User.objects.create(username=f"reader{n}") for n in range(4)]
+
+    def read(self, user, day, age):
+        return ReadEvent.objects.create(
+            user=user, article=self.article, date=day, created_at=timezone.now() - timedelta(seconds=age),
+        )
+
+    def reads(self, day):
+        return (
+            ArticleDailyReads.objects.filter(article=self.article, date=day).values_list("reads", flat=True).first(),
+            SourceDailyReads.objects.filter(source=self.source, date=day).values_list("reads", flat=True).first(),
+        )
+
+    def roll_up(self):
+        return rollups.roll_up(batch_size=2, log=lambda *args: None)
+
+    @override_settings(ROLLUP_LAG_SECONDS=60)
+    def test_second_run_processes_nothing(self):
+        today = timezone.localdate()
+        for user in self.users[:3]:
+            self.read(user, today, age=3600)
+
+        self.assertEqual(self.roll_up(), 3)
+        self.assertEqual(self.roll_up(), 0)
+        self.assertEqual(self.reads(today), (3, 3))
+
+        self.read(self.users[3], today, age=3600)
+        self.assertEqual(self.roll_up(), 1)
+        self.assertEqual(self.reads(today), (4, 4))
+
+    @override_settings(ROLLUP_LAG_SECONDS=60)
+    def test_rows_inside_the_lag_wait(self):
+        today = timezone.localdate()
+        settled = self.read(self.users[0], today, age=3600)
+        self.read(self.users[1], today, age=0)
+        self.read(self.users[2], today, age=3600)  # behind a newer id, so it waits too
+
+        self.assertEqual(self.roll_up(), 1)
+        self.assertEqual(RollupState.objects.get(name=rollups.STATE_NAME).last_id, settled.pk)
+        self.assertEqual(self.reads(today), (1, 1))
+
+        with override_settings(ROLLUP_LAG_SECONDS=0):
+            self.assertEqual(self.roll_up(), 2)
+        self.assertEqual(self.reads(today), (3, 3))
+
+    @override_settings(ROLLUP_LAG_SECONDS=0)
+    def test_prune_keeps_rows_not_rolled_up(self):
+        old = timezone.localdate() - timedelta(days=30)
+        self.read(self.users[0], old, age=0)
+        self.roll_up()
+        pending = self.read(self.users[1], old, age=0)
+        recent = self.read(self.users[2], timezone.localdate(), age=0)
+
+        self.assertEqual(rollups.prune(keep_days=7, log=lambda *args: None), 1)
+        self.assertEqual(set(ReadEvent.objects.values_list("pk", flat=True)), {pending.pk, recent.pk})
+
+
+class DetailPageTests(TestCase):
+    """The detail page comes from the pre-rendered cache; the tier gate and meter are per request."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.source = Source.objects.create(name="example.com", url="https://example.com/feed/")
+        cls.articles = [_article(cls.source, n) for n in range(12)]
+        cls.standard_article = _article(cls.source, 99, title="Members only", tier="standard")
+
+    def setUp(self):
+        shared.clear()
+        cache.local.clear()
+
+    def get(self, article, client=None):
+        return (client or self.client).get(reverse("article_detail", args=[article.pk]))
+
+    def test_cached_entry_needs_no_queries(self):
+        article = self.articles[0]
+        detail_cache.warm(article)
+        with self.assertNumQueries(0):
+            response = self.get(article)
+        self.assertContains(response, article.title)
+
+    def test_miss_renders_and_caches(self):
+        article = self.articles[0]
+        self.assertEqual(detail_cache.get_detail(article.pk)["title"], article.title)
+        with mock.patch.object(detail_cache, "_render") as render:
+            detail_cache.get_detail(article.pk)
+        render.assert_not_called()
+        self.assertIsNone(detail_cache.get_detail(10**6))
+
+    def test_save_invalidates_the_cached_entry(self):
+        article = self.articles[0]
+        self.get(article)
+        article.title = "Corrected headline"
+        article.save()
+        self.assertContains(self.get(article), "Corrected headline")
+
+    def test_tier_gate(self):
+        free, standard = self.client_class(), self.client_class()
+        free.force_login(_reader("free-reader"))
+        standard.force_login(_reader("paying-reader", tier="Standard"))
+
+        self.assertTrue(self.get(self.standard_article).context["gated"])
+        self.assertTrue(self.get(self.standard_article, free).context["gated"])
+        response = self.get(self.standard_article, standard)
+        self.assertFalse(response.context["gated"])
+        self.assertContains(response, "Members only")
+        self.assertFalse(self.get(self.articles[0], free).context["gated"])
+
+    def assertMeterLimit(self, client, limit):
+        for article in self.articles[:limit]:
+            self.assertFalse(self.get(article, client).context["walled"])
+        self.assertTrue(self.get(self.articles[limit], client).context["walled"])
+
+    def test_anonymous_limit(self):
+        self.assertMeterLimit(self.client, 3)
+
+    def test_free_limit(self):
+        self.client.force_login(_reader("free-reader"))
+        self.assertMeterLimit(self.client, 5)
+        # Logged-in reads are per article: re-reading one counted today stays open.
+        self.assertFalse(self.get(self.articles[0]).context["walled"])
+
+    def test_standard_limit(self):
+        self.client.force_login(_reader("paying-reader", tier="Standard"))
+        self.assertMeterLimit(self.client, 11)
+
+
+class FreshnessTests(TestCase):
+    """Ingest runs from cron (`ingest_news --if-due`), never from a page view."""
+
+    def setUp(self):
+        shared.clear()
+
+    def ingest(self, *args):
+        with mock.patch("news.ingest.APIFetch.GetContent") as get_content:
+            call_command("ingest_news", *args, stdout=StringIO())
+        return get_content.call_count
+
+    def test_if_due_ingests_when_never_run(self):
+        self.assertEqual(self.ingest("--if-due"), 1)
+
+    def test_if_due_skips_fresh_content(self):
+        freshness.mark_ingested()
+        self.assertEqual(self.ingest("--if-due"), 0)
+        self.assertEqual(self.ingest(), 1)  # a manual run always ingests
+
+    def test_if_due_ingests_after_ttl(self):
+        shared.set(freshness.LAST_RUN_KEY, timezone.now() - timedelta(minutes=11), None)
+        with override_settings(TTL_MINUTES=10):
+            self.assertEqual(self.ingest("--if-due"), 1)
+
+    def test_pages_never_ingest(self):
+        with mock.patch("news.ingest.APIFetch.GetContent") as get_content:
+            self.client.get(reverse("home"))
+        get_content.assert_not_called()
+
+
+class AdminScaleTests(TestCase):
+    """Changelist counts never scan the table, and prefix search stays on an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.source = Source.objects.create(name="example.com", url="https://example.com/feed/")
+        for n, title in enumerate(["Chip launch", "CHIPS act", "chipmakers rally", "Other news"]):
+            _article(cls.source, n, title=title)
+
+    def count(self, queryset):
+        return EstimatedCountPaginator(queryset.order_by("-pk"), 10).count
+
+    def test_tier_action_pages_the_invalidation(self):
+        from . import admin as news_admin
+
+        other = Article.objects.get(title="Other news")
+        other.tier = "standard"
+        other.save()
+        model_admin = admin_site._registry[Article]
+        with mock.patch.object(news_admin, "INVALIDATE_BATCH_SIZE", 3), \
+                mock.patch.object(detail_cache, "invalidate") as invalidate, \
+                mock.patch.object(model_admin, "message_user") as message_user:
+            model_admin.make_standard(RequestFactory().post("/"), Article.objects.all())
+
+        self.assertEqual(message_user.call_args.args[1], "Set 3 article(s) to standard.")
+        self.assertEqual(set(Headline.objects.values_list("tier", flat=True)), {"standard"})
+        pks = sorted(Article.objects.values_list("pk", flat=True))
+        self.assertEqual([call.args[0] for call in invalidate.call_args_list], [pks[:3], pks[3:]])
+
+    @override_settings(ADMIN_COUNT_LIMIT=3)
+    def test_unanalyzed_table_gets_a_bounded_count(self):
+        # Deleting rows must not leave a stale estimate behind (Max(pk) would say 5).
+        _article(self.source, 4).delete()
+        self.assertEqual(self.count(Article.objects.all()), 3)
+
+    @override_settings(ADMIN_COUNT_LIMIT=3)
+    def test_analyzed_table_uses_the_planner_estimate(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("sqlite_stat1 is SQLite-specific.")
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.assertEqual(self.count(Article.objects.all()), 4)
+        self.assertEqual(self.count(Article.objects.filter(tier="free")), 3)  # filtered: capped count
+
+    def search(self, model, term):
+        model_admin = admin_site._registry[model]
+        queryset, _ = model_admin.get_search_results(RequestFactory().get("/"), model.objects.all(), term)
+        return queryset
+
+    def test_title_search_ignores_case(self):
+        for term in ("chip", "CHIP", "Chip"):
+            with self.subTest(term=term):
+                titles = set(self.search(Article, term).values_list("title", flat=True))
+                self.assertEqual(titles, {"Chip launch", "CHIPS act", "chipmakers rally"})
+
+    def test_title_search_uses_the_lower_index(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("EXPLAIN QUERY PLAN is SQLite-specific.")
+        self.assertIn("idx_article_title_lower", self.search(Article, "chip").explain())
+
+    def test_username_search_is_case_sensitive(self):
+        # Documented limitation: as typed or capitalized, never other casings.
+        article = Article.objects.first()
+        for username in ("reader", "Reader2", "READER3"):
+            ReadEvent.objects.create(user=User.objects.create(username=username), article=article, date=date.today())
+        usernames = {
+            term: set(self.search(ReadEvent, term).values_list("user__username", flat=True))
+            for term in ("reader", "READER")
+        }
+        self.assertEqual(usernames, {"reader": {"reader", "Reader2"}, "READER": {"READER3"}})
@@ -0,0 +1,184 @@
+"""
+news/thumbnails.py
+
+Local image proxy for article cards:
+- Each publisher image is fetched once, resized to a fixed box, and stored on disk.
+- Files live under THUMBNAIL_ROOT/<size>/<key[:2]>/<key>.jpg, where the key is a
+  hash of the source image URL, so a URL never points at different bytes.
+- One worker builds a missing thumbnail (cache.lock); the others wait for the file.
+  Failures are remembered for THUMBNAIL_FAILURE_SECONDS, so a broken image isn't
+  fetched again on every page view.
+- Feed image URLs come from publishers, so fetches only go to public addresses
+  (every redirect hop is checked) and oversized images are refused before decoding.
+  The connection goes to the address that was checked, not to a second DNS lookup,
+  so a host can't pass the check and then resolve to an internal address.
+"""
+
+import hashlib
+import ipaddress
+import os
+import socket
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+from django.conf import settings
+from django.core.cache import cache as shared
+
+from ragtagnews import cache
+
+
+class ThumbnailError(Exception):
+    """Raised when an image cannot be fetched or decoded."""
+
+
+def thumbnail_key(image_url: str) -> str:
+    return hashlib.sha256(image_url.encode("utf-8")).hexdigest()[:32]
+
+
+def thumbnail_path(size: str, key: str) -> Path:
+    return Path(settings.THUMBNAIL_ROOT) / size / key[:2] / f"{key}.jpg"
+
+
+def _failure_key(key: str) -> str:
+    return f"thumbnail:failed:{key}"
+
+
+def build_thumbnail(image_url: str, size: str) -> Path:
+    """Fetches, resizes and stores the thumbnail for `image_url`; returns its path."""
+    key = thumbnail_key(image_url)
+    path = thumbnail_path(size, key)
+    if path.exists():
+        return path
+    failure = shared.get(_failure_key(key))
+    if failure is not None:
+        raise ThumbnailError(failure)
+
+    with cache.lock(f"thumbnail:{size}:{key}") as acquired:
+        if not acquired:
+            return _wait_for(path, key)
+        if path.exists():  # built by the previous lock holder
+            return path
+        try:
+            data = _resize(_fetch(image_url), settings.THUMBNAIL_SIZES[size])
+        except ThumbnailError as e:
+            shared.set(_failure_key(key), str(e), settings.THUMBNAIL_FAILURE_SECONDS)
+            raise
+        _write(path, data)
+    return path
+
+
+def _wait_for(path: Path, key: str) -> Path:
+    deadline = time.monotonic() + settings.CACHE_LOCK_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        if path.exists():
+            return path
+        failure = shared.get(_failure_key(key))
+        if failure is not None:
+            raise ThumbnailError(failure)
+    raise ThumbnailError("Timed out waiting for another worker to build the thumbnail.")
+
+
+def _write(path: Path, data: bytes) -> None:
+    # Write to a temp file and rename so concurrent requests never serve a partial image.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def _check_public(url: str) -> str:
+    """Returns the address to connect to for `url`.
+
+    Raises ThumbnailError unless `url` is http(s) and its host resolves only to public addresses.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ThumbnailError(f"Unsupported image URL: {url}")
+    try:
+        infos = socket.getaddrinfo(parts.hostname, parts.port or parts.scheme, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError) as e:
+        raise ThumbnailError(f"Could not resolve {parts.hostname}: {e}") from e
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        # is_global is False for private, loopback, link-local, reserved and shared ranges.
+        if not address.is_global or address.is_multicast:
+            raise ThumbnailError(f"Refusing to fetch {parts.hostname}: {address} is not a public address.")
+    return str(ipaddress.ip_address(infos[0][4][0].split("%")[0]))
+
+
+def _pinned(url: str, address: str) -> tuple[str, dict]:
+    """(`url` with its host replaced by `address`, headers naming the original host)."""
+    parts = urlsplit(url)
+    host = f"[{address}]" if ":" in address else address
+    netloc = f"{host}:{parts.port}" if parts.port else host
+    return urlunsplit(parts._replace(netloc=netloc)), {"Host": parts.netloc.rpartition("@")[2]}
+
+
+def _session(hostname: str):
+    import requests
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter()
+    # The URL names an IP; TLS still sends SNI for, and checks the certificate against, the host.
+    adapter.poolmanager.connection_pool_kw.update(server_hostname=hostname, assert_hostname=hostname)
+    session.mount("https://", adapter)
+    return session
+
+
+def _fetch(image_url: str) -> bytes:
+    import requests  # Deferred: only thumbnail misses need it, not worker boot.
+
+    max_bytes = settings.THUMBNAIL_MAX_BYTES
+    url = image_url
+    try:
+        # Redirects are followed by hand so every hop gets the same address check.
+        for _ in range(settings.THUMBNAIL_MAX_REDIRECTS + 1):
+            pinned_url, headers = _pinned(url, _check_public(url))
+            with _session(urlsplit(url).hostname) as session, session.get(
+                pinned_url, headers=headers, timeout=settings.FETCH_TIMEOUT_SECONDS, stream=True, allow_redirects=False
+            ) as response:
+                if response.is_redirect:
+                    url = urljoin(url, response.headers["Location"])
+                    continue
+                response.raise_for_status()
+                body = bytearray()
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    body.extend(chunk)
+                    if len(body) > max_bytes:
+                        raise ThumbnailError(f"Image larger than {max_bytes} bytes.")
+                return bytes(body)
+    except requests.RequestException as e:
+        raise ThumbnailError(f"Could not fetch image: {e}") from e
+    raise ThumbnailError(f"More than {settings.THUMBNAIL_MAX_REDIRECTS} redirects.")
+
+
+def _resize(raw: bytes, box: tuple[int, int]) -> bytes:
+    # Pillow is only needed by whoever generates a thumbnail, not by every request.
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(BytesIO(raw)) as image:
+            # open() only reads the header; refuse huge images before decoding any pixels.
+            width, height = image.size
+            if width * height > settings.THUMBNAIL_MAX_PIXELS:
+                raise ThumbnailError(f"Image is {width}x{height}, more than {settings.THUMBNAIL_MAX_PIXELS} pixels.")
+            image = ImageOps.exif_transpose(image).convert("RGB")
+            # Crop to fill the box exactly, matching the card's `object-fit: cover`.
+            thumb = ImageOps.fit(image, box, Image.Resampling.LANCZOS)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ThumbnailError(f"Could not decode image: {e}") from e
+
+    out = BytesIO()
+    thumb.save(out, format="JPEG", quality=80, optimize=True, progressive=True)
+    return out.getvalue()
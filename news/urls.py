@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import home_view, article_detail_view
+from .views import home_view, article_detail_view, thumbnail_view
 
 urlpatterns = [
     path('', home_view, name='home'),
-    path('article/<int:article_id>/', article_detail_view, name='article_detail')
+    path('article/<int:article_id>/', article_detail_view, name='article_detail'),
+    path('thumbnails/<slug:size>/<int:article_id>/<slug:key>.jpg', thumbnail_view, name='article_thumbnail'),
 ]
\ No newline at end of file
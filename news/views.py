@@ -1,164 +1,141 @@
-from django.shortcuts import render, get_object_or_404
-from django.core.paginator import Paginator
+from django.shortcuts import render, redirect
+from django.core.paginator import Page, Paginator
 from django.conf import settings
 from django.utils import timezone
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, FileResponse, Http404
+from django.utils.cache import patch_cache_control
+from django.utils.http import urlencode
+from django.utils.safestring import mark_safe
+from django.db.models import Exists, OuterRef
 from datetime import timedelta
-import hashlib
-import feedparser
-from pathlib import Path
-from dateutil.parser import parse as parse_datetime
+from logging import getLogger
+import math
 
-from .models import Article, Source
+from ragtagnews import cache
 
-class APIFetch:
-    @staticmethod
-    def GetContent():
-        # 1. --- Concurrency Lock ---
-        # Ensure only one instance of the command runs at a time.
-        lock_file = Path(settings.BASE_DIR) / "ingest_news.lock"
-        if lock_file.exists():
-            raise Exception("Ingestion command is already running. If this is an error, delete the .lock file.")
-        
-        try:
-            lock_file.touch()
-            print("Successfully acquired lock file.")
-
-            # 2. --- Seed Sources ---
-            # Ensure the Source table has entries matching settings.FEEDS
-            APIFetch._seed_sources()
-
-            # 3. --- Main Ingestion Logic ---
-            APIFetch._fetch_and_process_feeds()
-
-        finally:
-            # 4. --- Release Lock ---
-            # Guarantees the lock file is removed, even if errors occur.
-            lock_file.unlink()
-            print("Lock file released. Ingestion finished.")
-
-    @staticmethod
-    def _seed_sources():
-        """Ensures the database has a Source object for each URL in settings."""
-        print("Seeding sources from settings...")
-        seeded_count = 0
-        for feed_url in settings.FEEDS:
-            # get_or_create is idempotent and safe to run multiple times.
-            source, created = Source.objects.get_or_create(
-                url=feed_url,
-                defaults={
-                    "name": feed_url.split("//")[-1].split("/")[0],  # Best-effort name
-                    "type": "rss",
-                    "enabled": True,
-                },
-            )
-            if created:
-                seeded_count += 1
-                print(f"  + Created source: {source.name}")
-        
-        if seeded_count > 0:
-            print(f"{seeded_count} new sources were added to the database.")
-        else:
-            print("All sources from settings already existed in the database.")
-
-    @staticmethod
-    def _fetch_and_process_feeds():
-        """Fetches content from all enabled sources and processes their articles."""
-        enabled_sources = Source.objects.filter(enabled=True)
-        print(f"\nFound {enabled_sources.count()} enabled sources to fetch.")
-
-        for source in enabled_sources:
-            print(f"\n--- Fetching from: {source.name} ---")
-            try:
-                # Use a timeout to prevent the command from hanging indefinitely.
-                # Note: feedparser doesn't have a direct timeout, this would be
-                # better with 'requests', but for MVP we stick to the plan.
-                feed = feedparser.parse(source.url)
-                
-                if feed.bozo:
-                    # bozo is true if the feed is malformed.
-                    raise ValueError(f"Feed is malformed. Bozo reason: {feed.bozo_exception}")
-
-                for entry in feed.entries:
-                    APIFetch._process_entry(source, entry)
-
-            except Exception as e:
-                print(f"Error processing {source.name}: {e}")
-                # The loop continues to the next source.
-
-    @staticmethod
-    def _process_entry(source, entry):
-        """Processes a single entry from an RSS feed and upserts it to the database."""
-        # --- Defensive Data Parsing ---
-        if not hasattr(entry, 'link'):
-            print("  - Skipping entry with no link.")
-            return
-        
-        # --- Deduplication ---
-        hash_input = entry.link.encode('utf-8')
-        dedup_hash = hashlib.sha256(hash_input).hexdigest()
-
-        # --- Date Normalization ---
-        published_time = timezone.now()  # Default to now
-        if hasattr(entry, 'published'):
-            try:
-                dt = parse_datetime(entry.published)
-                if timezone.is_naive(dt):
-                    # Assume the feed's timezone is the project's default timezone
-                    published_time = timezone.make_aware(dt, timezone.get_default_timezone())
-                else:
-                    # It's already aware, just use it
-                    published_time = dt
-            except (TypeError, ValueError):
-                print(f"  ? Could not parse date: {entry.get('published')}")
-        
-        # --- Database Upsert ---
-        article, created = Article.objects.update_or_create(
-            hash=dedup_hash,
-            defaults={
-                'source': source,
-                'title': entry.get('title', 'No Title Provided'),
-                'url': entry.link,
-                'summary': entry.get('summary', ''),
-                'published_at': published_time,
-                'tier': "free"
-            }
-        )
+from . import detail_cache, metering, rollups
+from .models import Article, ArticleTag, Headline, Source, Tag
+from .thumbnails import ThumbnailError, build_thumbnail, thumbnail_key, thumbnail_path
 
-        if created:
-            print(f"  + Created: {article.title[:60]}...")
-        else:
-            print(f"  = Exists: {article.title[:60]}...")
+logger = getLogger(__name__)
 
 
 class ContentManagement:
+    PER_PAGE = 15
+    # Headlines may be served this long past freshness while one worker recomputes them.
+    STALE_SECONDS = 60
+
     @staticmethod
     def GetConent(request):
-        APIFetch.GetContent()
-
-        # Content filtering while fetching; Articles with "sources" in title are unreliable trash
-        article_list = Article.objects.exclude(title__icontains="sources").order_by('-published_at')  
+        # Tag and source facets with their rolled-up counts. Only values listed here
+        # are accepted as filters, which also bounds the number of cache keys below.
+        facets = cache.get_or_compute(
+            "headlines:facets", ContentManagement._facets,
+            ttl=settings.HEADLINES_CACHE_SECONDS, stale_ttl=ContentManagement.STALE_SECONDS, namespace="articles",
+        )
+        tag = request.GET.get('tag')
+        if tag not in {facet['name'] for facet in facets['tags']}:
+            tag = None
+        source = request.GET.get('source')
+        source_ids = {facet['name']: facet['pk'] for facet in facets['sources']}
+        if source not in source_ids:
+            source = None
+        filters = f"tag={tag or ''}:source={source or ''}"
+        active_filters = {name: value for name, value in (('tag', tag), ('source', source)) if value}
+
+        # Total count and newest ingest time, shared by every page.
+        meta = cache.get_or_compute(
+            f"headlines:meta:{filters}", lambda: ContentManagement._headline_meta(tag, source_ids.get(source)),
+            ttl=settings.HEADLINES_CACHE_SECONDS, stale_ttl=ContentManagement.STALE_SECONDS, namespace="articles",
+        )
 
-        # Paginate Articles
-        paginator = Paginator(article_list, 15)  # 15 per page
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+        # Paginate Articles; clamp the page number first so junk ?page= values share one cache key.
+        num_pages = max(1, math.ceil(meta['count'] / ContentManagement.PER_PAGE))
+        try:
+            number = min(max(int(request.GET.get('page', 1)), 1), num_pages)
+        except (TypeError, ValueError):
+            number = 1
+        rows = cache.get_or_compute(
+            f"headlines:page:{number}:{filters}", lambda: ContentManagement._headline_rows(number, tag, source_ids.get(source)),
+            ttl=settings.HEADLINES_CACHE_SECONDS, stale_ttl=ContentManagement.STALE_SECONDS, namespace="articles",
+        )
+        # The paginator only needs the count to drive the page links.
+        paginator = Paginator(range(meta['count']), ContentManagement.PER_PAGE)
+        page_obj = Page(rows, number, paginator)
 
         # Check for Stale Content
         is_stale = False
         minutes = settings.TTL_MINUTES
-        if article_list.exists():
-            latest_article = article_list.first()
-            if latest_article.ingested_at < timezone.now() - timedelta(minutes=settings.TTL_MINUTES):
+        latest_ingested_at = meta['latest_ingested_at']
+        if latest_ingested_at is not None:
+            if latest_ingested_at < timezone.now() - timedelta(minutes=settings.TTL_MINUTES):
                 is_stale = True
 
         return {
             'page_obj': page_obj,
             'is_stale': is_stale,
             'current_tier': None,  # For next class
-            'minutes': minutes
+            'minutes': minutes,
+            'facets': facets,
+            'trending': rollups.trending(),
+            'tag': tag,
+            'source': source,
+            # Prefix for pagination links so they keep the active filters.
+            'filter_query': (urlencode(active_filters) + '&') if active_filters else '',
         }
 
+    @staticmethod
+    def _headline_list(source_id=None):
+        # Hidden articles have no Headline row, so there is nothing to exclude here.
+        headline_list = Headline.objects.all()
+        if source_id:
+            # By id, so the filter and the ordering both come from idx_headline_source_pub.
+            headline_list = headline_list.filter(source_id=source_id)
+        return headline_list.order_by('-published_at')
+
+    @staticmethod
+    def _tagged_ids(tag, source_id=None):
+        # Walks idx_articletag_tag_pub in order; the Headline probe (by primary key)
+        # drops hidden articles and applies the source filter.
+        listed = Headline.objects.filter(pk=OuterRef('article_id'))
+        if source_id:
+            listed = listed.filter(source_id=source_id)
+        return (
+            ArticleTag.objects.filter(tag__name=tag).filter(Exists(listed))
+            .order_by('-published_at').values_list('article_id', flat=True)
+        )
+
+    @staticmethod
+    def _facets():
+        # Both tables are small and carry their own counts; no scan of Article.
+        return {
+            'tags': list(Tag.objects.filter(article_count__gt=0).order_by('-article_count', 'name').values('name', 'article_count')),
+            'sources': list(Source.objects.filter(article_count__gt=0).order_by('name').values('pk', 'name', 'article_count')),
+        }
+
+    @staticmethod
+    def _headline_meta(tag=None, source_id=None):
+        if tag:
+            count = ContentManagement._tagged_ids(tag, source_id).count()
+        else:
+            count = ContentManagement._headline_list(source_id).count()
+        newest = ContentManagement._headline_list().values_list('pk', flat=True).first()
+        return {
+            'count': count,
+            # Staleness is about the whole feed, not the filtered slice.
+            'latest_ingested_at': Article.objects.filter(pk=newest).values_list('ingested_at', flat=True).first(),
+        }
+
+    @staticmethod
+    def _headline_rows(number, tag=None, source_id=None):
+        start = (number - 1) * ContentManagement.PER_PAGE
+        end = start + ContentManagement.PER_PAGE
+        if not tag:
+            return list(ContentManagement._headline_list(source_id)[start:end])
+        ids = list(ContentManagement._tagged_ids(tag, source_id)[start:end])
+        rows = Headline.objects.in_bulk(ids)
+        return [rows[pk] for pk in ids if pk in rows]
+
 
 class TierDiscriminator:
     @staticmethod
@@ -166,20 +143,19 @@ class TierDiscriminator:
 
         context = ContentManagement.GetConent(request)
 
-        # Fetch and filter articles
-        sub_articles = Article.objects.filter(source__name__in=["techcrunch.com", "arstechnica.com"])
-        for article in sub_articles:
-            article.tier = "standard"
-            article.save(update_fields=["tier"])
+        # Article tiers are assigned at ingest (settings.STANDARD_SOURCES), not here.
 
         # Determine User's Tier;
-        if request.user.is_authenticated:
-            context['current_tier'] = request.user.profile.get_current_tier() #returns 'Standard' or 'free'
-        else:
-            context['current_tier'] = "anonymous"
+        context['current_tier'] = TierDiscriminator.current_tier(request)
 
         return context
 
+    @staticmethod
+    def current_tier(request):
+        if request.user.is_authenticated:
+            return request.user.profile.get_current_tier() #returns 'Standard' or 'free'
+        return "anonymous"
+
 
 def home_view(request):
     context = TierDiscriminator.GetConent(request)
@@ -189,9 +165,49 @@ def home_view(request):
 
 def article_detail_view(request, article_id):
     #Displays the details for a single article with tier-based restrictions.
-    article = get_object_or_404(Article, pk=article_id)
+    #The article itself comes pre-rendered from the cache; only the tier gate and
+    #the daily meter are worked out per request.
+    entry = detail_cache.get_detail(article_id)
+    if entry is None:
+        raise Http404("No Article matches the given query.")
 
+    current_tier = TierDiscriminator.current_tier(request)
     context = {
-        'article': article
+        'article': entry,
+        'body': mark_safe(entry['body']),
+        'current_tier': current_tier,
+        'gated': entry['tier'] == "standard" and current_tier.lower() not in settings.PAID_TIERS,
     }
-    return render(request, 'article_detail.html', context)
\ No newline at end of file
+
+    meter = None
+    if not context['gated']:
+        meter = metering.meter_read(request, current_tier, article_id)
+        context.update(walled=meter.walled, reads_left=meter.reads_left, read_limit=meter.limit)
+
+    response = render(request, 'article_detail.html', context)
+    if meter is not None:
+        metering.apply(meter, response)
+    return response
+
+
+def thumbnail_view(request, size, article_id, key):
+    #Serves a resized copy of an article's image, fetching it from the publisher on first use.
+    if size not in settings.THUMBNAIL_SIZES:
+        raise Http404("Unknown thumbnail size.")
+
+    path = thumbnail_path(size, key)
+    if not path.exists():
+        image_url = Article.objects.filter(pk=article_id).values_list('image_url', flat=True).first()
+        if not image_url or thumbnail_key(image_url) != key:
+            raise Http404("No such thumbnail.")
+        try:
+            build_thumbnail(image_url, size)
+        except ThumbnailError as e:
+            # Fall back to hotlinking the original rather than showing a broken image.
+            logger.warning("Thumbnail failed for article %s: %s", article_id, e)
+            return redirect(image_url)
+
+    # The URL embeds the image key, so the bytes behind it never change.
+    response = FileResponse(open(path, 'rb'), content_type='image/jpeg')
+    patch_cache_control(response, public=True, max_age=settings.THUMBNAIL_CACHE_SECONDS, immutable=True)
+    return response
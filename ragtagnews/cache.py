@@ -0,0 +1,251 @@
+"""
+ragtagnews/cache.py
+
+Two-level cache for hot read paths (headlines, tier, article detail).
+
+- L1: a small in-process LRU, so repeat reads in a worker skip I/O altogether.
+- L2: Django's `default` cache (file-based, shared by every worker on the host).
+- Versioned namespaces: keys live under `<namespace>:<version>:`. `bump(namespace)`
+  writes a new random version, so every key in it is orphaned at once (ingest
+  bumps "articles" when content changes). Workers re-read a namespace's version
+  at most every CACHE_VERSION_CHECK_SECONDS. Version markers expire after
+  CACHE_NAMESPACE_SECONDS; an expired (or deleted, see `bump_many`) one just
+  starts a new version.
+- Single-flight: when a key is missing or stale, only the worker holding its lock
+  recomputes it. Others serve the stale value if there is one, or wait briefly.
+- Stale-while-revalidate: values are kept `stale_ttl` seconds past freshness so
+  there is something to serve while that recompute runs.
+
+`stats()` returns this process's hit/miss/stale/eviction counters (shown at /_perf/).
+"""
+
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache as shared
+
+from .perf import record_cache
+
+_MISSING = object()
+
+
+class LocalLRU:
+    """Thread-safe in-process LRU of key -> (value, expires_at)."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING
+            value, expires_at = item
+            if expires_at <= now:
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                _count("evictions")
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local = LocalLRU(getattr(settings, "CACHE_L1_MAX_ENTRIES", 2000))
+_counters = Counter()
+_counters_lock = threading.Lock()
+
+
+def _count(name, n=1):
+    with _counters_lock:
+        _counters[name] += n
+
+
+def stats():
+    with _counters_lock:
+        return dict(_counters)
+
+
+# --------------------------------------------------------------------------
+# Namespaces
+# --------------------------------------------------------------------------
+
+def _version(namespace, now):
+    key = f"ns:{namespace}"
+    version = local.get(key, now)
+    if version is _MISSING:
+        version = shared.get(key)
+        if version is None:
+            # Never reuse an old version after the marker is lost: start a fresh one.
+            version = uuid4().hex[:12]
+            if not shared.add(key, version, settings.CACHE_NAMESPACE_SECONDS):
+                version = shared.get(key) or version
+        local.set(key, version, now + settings.CACHE_VERSION_CHECK_SECONDS)
+    return version
+
+
+def bump(namespace):
+    """Invalidates every key in `namespace`, in every worker."""
+    key = f"ns:{namespace}"
+    shared.set(key, uuid4().hex[:12], settings.CACHE_NAMESPACE_SECONDS)
+    local.delete(key)
+
+
+def bump_many(namespaces):
+    """bump() for many namespaces at once (e.g. one per article).
+
+    Deletes the version markers instead of writing new ones: the next read of each
+    namespace starts a fresh version, and no cache entry is written per namespace.
+    """
+    keys = [f"ns:{namespace}" for namespace in namespaces]
+    shared.delete_many(keys)
+    for key in keys:
+        local.delete(key)
+
+
+def _full_key(key, namespace, now):
+    if namespace is None:
+        return key
+    return f"{namespace}:{_version(namespace, now)}:{key}"
+
+
+# --------------------------------------------------------------------------
+# Read / write
+# --------------------------------------------------------------------------
+
+def get_or_compute(key, compute, *, ttl, stale_ttl=0, namespace=None, use_local=True):
+    """
+    Returns the cached value for `key`, calling `compute()` when it is missing or stale.
+
+    `ttl` is how long a value is fresh. `stale_ttl` is how much longer it may be served
+    while one worker recomputes it. `use_local=False` skips L1 for values that must
+    change everywhere as soon as they are invalidated, like a user's tier after a purchase.
+    """
+    now = time.time()
+    full_key = _full_key(key, namespace, now)
+
+    if use_local:
+        value = local.get(full_key, now)
+        if value is not _MISSING:
+            _count("l1_hits")
+            record_cache(True)
+            return value
+
+    entry = shared.get(full_key)
+    if entry is not None:
+        value, fresh_until = entry
+        if now < fresh_until:
+            _count("l2_hits")
+            record_cache(True)
+            if use_local:
+                local.set(full_key, value, min(fresh_until, now + settings.CACHE_L1_SECONDS))
+            return value
+
+    lock_key = f"lock:{full_key}"
+    lock_timeout = settings.CACHE_LOCK_SECONDS
+    if _acquire(lock_key, lock_timeout):
+        try:
+            _count("misses")
+            record_cache(False)
+            return _store(full_key, compute(), ttl, stale_ttl, use_local)
+        finally:
+            _release(lock_key)
+
+    if entry is not None:
+        # Someone else is recomputing; the stale value is good enough for this request.
+        _count("stale_served")
+        record_cache(True)
+        return entry[0]
+
+    # Cold key being computed elsewhere: wait for it rather than piling onto the DB.
+    _count("lock_waits")
+    deadline = now + lock_timeout
+    while time.time() < deadline:
+        time.sleep(0.05)
+        entry = shared.get(full_key)
+        if entry is not None:
+            record_cache(True)
+            return entry[0]
+
+    _count("misses")
+    record_cache(False)
+    return _store(full_key, compute(), ttl, stale_ttl, use_local)
+
+
+# Threads in one process coordinate through `_inflight`; processes through `shared.add`.
+# FileBasedCache.add is check-then-write, so two workers can occasionally both
+# recompute the same key. That costs one extra query, never a wrong value.
+_inflight = set()
+_inflight_lock = threading.Lock()
+
+
+def _acquire(lock_key, timeout):
+    with _inflight_lock:
+        if lock_key in _inflight:
+            return False
+        _inflight.add(lock_key)
+    if shared.add(lock_key, True, timeout):
+        return True
+    with _inflight_lock:
+        _inflight.discard(lock_key)
+    return False
+
+
+def _release(lock_key):
+    shared.delete(lock_key)
+    with _inflight_lock:
+        _inflight.discard(lock_key)
+
+
+@contextmanager
+def lock(name, timeout=None):
+    """Single-flight lock on `name` across threads and workers; yields whether this caller holds it.
+
+    For work that isn't a cached value (e.g. writing a file): the holder does it,
+    everyone else waits for the result some other way.
+    """
+    lock_key = f"lock:{name}"
+    acquired = _acquire(lock_key, timeout or settings.CACHE_LOCK_SECONDS)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            _release(lock_key)
+
+
+def put(key, value, *, ttl, stale_ttl=0, namespace=None, use_local=True):
+    """Stores a precomputed value (e.g. a page warmed by ingest)."""
+    return _store(_full_key(key, namespace, time.time()), value, ttl, stale_ttl, use_local)
+
+
+def delete(key, namespace=None):
+    full_key = _full_key(key, namespace, time.time())
+    shared.delete(full_key)
+    local.delete(full_key)
+
+
+def _store(full_key, value, ttl, stale_ttl, use_local):
+    now = time.time()
+    shared.set(full_key, (value, now + ttl), ttl + stale_ttl)
+    if use_local:
+        local.set(full_key, value, now + min(ttl, settings.CACHE_L1_SECONDS))
+    return value
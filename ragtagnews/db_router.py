@@ -0,0 +1,99 @@
+"""
+ragtagnews/db_router.py
+
+Primary/replica routing.
+
+- Writes, migrations and reads of anything outside REPLICA_READ_MODELS go to
+  `default`, the primary. Payments, subscriptions, sessions and metering therefore
+  always see their own data.
+- Reads of REPLICA_READ_MODELS (headlines, detail, tags, trending) go to a random
+  DATABASE_REPLICAS alias. With no replicas configured everything stays on `default`.
+  A SQLite replica whose snapshot file doesn't exist yet (before the first
+  `sync_replicas`) is skipped, so reads fall back to the primary instead of failing.
+- Read-your-writes: once a request writes (other than REPLICA_PIN_EXEMPT models), the
+  rest of that request reads from the primary. ReplicaPinningMiddleware then sets a
+  short-lived cookie, so the same browser keeps reading from the primary for
+  REPLICA_STICKY_SECONDS. For SQLite snapshots that must cover REPLICA_SYNC_SECONDS,
+  the time between two `sync_replicas` runs, which is what the default is derived from.
+- `use_primary()` pins a block of code to the primary (ingest, rollups).
+"""
+
+import os
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY = "default"
+PIN_COOKIE = "db_pin"
+
+_pinned = ContextVar("db_pinned", default=False)
+_wrote = ContextVar("db_wrote", default=False)
+# SQLite replica aliases whose snapshot file has been seen. sync_replicas only ever
+# replaces the file, so once it exists it stays.
+_ready = set()
+
+
+@contextmanager
+def use_primary():
+    """Routes every read inside the block to the primary."""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+def _snapshot_ready(alias):
+    path = settings.SQLITE_REPLICA_FILES.get(alias)
+    if path is None or alias in _ready:
+        return True
+    if os.path.exists(path):
+        _ready.add(alias)
+        return True
+    return False
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or _pinned.get() or model._meta.label_lower not in settings.REPLICA_READ_MODELS:
+            return PRIMARY
+        replicas = [alias for alias in replicas if _snapshot_ready(alias)]
+        return random.choice(replicas) if replicas else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        if model._meta.label_lower not in settings.REPLICA_PIN_EXEMPT:
+            _pinned.set(True)
+            _wrote.set(True)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+class ReplicaPinningMiddleware:
+    """Scopes pinning to one request and carries it over to the next few via a cookie."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replicas = bool(settings.DATABASE_REPLICAS)
+        pinned = _pinned.set(replicas and PIN_COOKIE in request.COOKIES)
+        wrote = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            if replicas and _wrote.get():
+                response.set_cookie(
+                    PIN_COOKIE, "1", max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite="Lax"
+                )
+        finally:
+            _wrote.reset(wrote)
+            _pinned.reset(pinned)
+        return response
@@ -0,0 +1,57 @@
+"""
+ragtagnews/filecache.py
+
+FileBasedCache with cheaper culling.
+
+Django's FileBasedCache lists the whole cache directory on every set/add to decide
+whether to cull, which is O(files) per write, and then deletes a random sample,
+live entries included. This backend:
+
+- culls at most once every CULL_INTERVAL seconds per process (OPTIONS, default 60),
+  so writes in between cost one file write. The cache may overshoot MAX_ENTRIES by
+  whatever is written within one interval.
+- deletes expired entries first, and only samples live entries at random when the
+  cache is still over MAX_ENTRIES after that.
+"""
+
+import random
+import threading
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+
+# Backend instances are per thread; the cull schedule is per process and directory.
+_next_cull = {}
+_next_cull_lock = threading.Lock()
+
+
+class FileCache(FileBasedCache):
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._cull_interval = int(params.get("OPTIONS", {}).get("CULL_INTERVAL", 60))
+
+    def _cull(self):
+        now = time.monotonic()
+        with _next_cull_lock:
+            if now < _next_cull.get(self._dir, 0):
+                return
+            _next_cull[self._dir] = now + self._cull_interval
+
+        filelist = self._list_cache_files()
+        if len(filelist) < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            return self.clear()
+
+        live = []
+        for fname in filelist:
+            try:
+                with open(fname, "rb") as f:
+                    if not self._is_expired(f):  # deletes the file when expired
+                        live.append(fname)
+            except FileNotFoundError:
+                pass
+        if len(live) < self._max_entries:
+            return
+        for fname in random.sample(live, int(len(live) / self._cull_frequency)):
+            self._delete(fname)
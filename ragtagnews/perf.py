@@ -0,0 +1,234 @@
+"""
+ragtagnews/perf.py
+
+Per-request performance instrumentation:
+- `PerfMiddleware` times each sampled request and splits it into DB time, template
+  render time and everything else, counts queries, keeps the slowest SQL, and tallies
+  cache hits/misses reported through `record_cache()`.
+- Results go out as a `Server-Timing` header, an optional JSON-lines log, and a rolling
+  per-route window served by `perf_stats_view` with p50/p95/p99.
+- Sampled requests slower than PERF_PROFILE_SLOW_MS are dumped as cProfile traces.
+
+Settings (all optional): PERF_SAMPLE_RATE, PERF_SERVER_TIMING, PERF_WINDOW, PERF_LOG_FILE,
+PERF_PROFILE_SLOW_MS, PERF_PROFILE_DIR.
+"""
+
+import contextvars
+import cProfile
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import connections
+from django.http import JsonResponse
+from django.template.backends import django as django_backend
+
+_current = contextvars.ContextVar("perf_request_stats", default=None)
+
+
+@dataclass
+class RequestStats:
+    started: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    db_ms: float = 0.0
+    slowest_sql: str = ""
+    slowest_sql_ms: float = 0.0
+    template_ms: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+    def record_query(self, sql, elapsed_ms):
+        self.queries += 1
+        self.db_ms += elapsed_ms
+        if elapsed_ms > self.slowest_sql_ms:
+            self.slowest_sql, self.slowest_sql_ms = sql, elapsed_ms
+
+
+def record_cache(hit: bool):
+    """Called by cache helpers so the current request's hit/miss counts are reported."""
+    stats = _current.get()
+    if stats is None:
+        return
+    if hit:
+        stats.cache_hits += 1
+    else:
+        stats.cache_misses += 1
+
+
+def _query_timer(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    t0 = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.record_query(sql, (time.perf_counter() - t0) * 1000)
+
+
+# Views call render(), which returns an already-rendered HttpResponse, so template time
+# has to be taken at the backend Template. Only the top-level render goes through here;
+# {% extends %} and {% include %} are counted inside it.
+_original_render = django_backend.Template.render
+
+
+def _timed_render(self, context=None, request=None):
+    stats = _current.get()
+    if stats is None:
+        return _original_render(self, context, request)
+    t0 = time.perf_counter()
+    try:
+        return _original_render(self, context, request)
+    finally:
+        stats.template_ms += (time.perf_counter() - t0) * 1000
+
+
+django_backend.Template.render = _timed_render
+
+
+# --------------------------------------------------------------------------
+# Aggregation
+# --------------------------------------------------------------------------
+
+class RouteWindow:
+    """Rolling window of recent samples per route, shared by all threads in the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=getattr(settings, "PERF_WINDOW", 1000)))
+
+    def add(self, route, sample):
+        with self._lock:
+            self._samples[route].append(sample)
+
+    def summary(self):
+        with self._lock:
+            snapshot = {route: list(samples) for route, samples in self._samples.items()}
+
+        report = {}
+        for route, samples in snapshot.items():
+            wall = sorted(s["wall_ms"] for s in samples)
+            report[route] = {
+                "count": len(samples),
+                "p50_ms": _percentile(wall, 50),
+                "p95_ms": _percentile(wall, 95),
+                "p99_ms": _percentile(wall, 99),
+                "avg_queries": round(sum(s["queries"] for s in samples) / len(samples), 2),
+                "avg_db_ms": round(sum(s["db_ms"] for s in samples) / len(samples), 3),
+                "avg_template_ms": round(sum(s["template_ms"] for s in samples) / len(samples), 3),
+                "cache_hits": sum(s["cache_hits"] for s in samples),
+                "cache_misses": sum(s["cache_misses"] for s in samples),
+                "slowest_sql": max(samples, key=lambda s: s["slowest_sql_ms"])["slowest_sql"],
+            }
+        return report
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))  # nearest rank
+    return round(sorted_values[rank - 1], 3)
+
+
+window = RouteWindow()
+_log_lock = threading.Lock()
+
+
+# --------------------------------------------------------------------------
+# Middleware and stats endpoint
+# --------------------------------------------------------------------------
+
+class PerfMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "PERF_SAMPLE_RATE", 1.0)
+        self.server_timing = getattr(settings, "PERF_SERVER_TIMING", settings.DEBUG)
+        self.log_file = getattr(settings, "PERF_LOG_FILE", None)
+        self.profile_slow_ms = getattr(settings, "PERF_PROFILE_SLOW_MS", 0)
+        self.profile_dir = Path(getattr(settings, "PERF_PROFILE_DIR", settings.BASE_DIR / "profiles"))
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        profiler = cProfile.Profile() if self.profile_slow_ms else None
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(_query_timer))
+                if profiler is not None:
+                    try:
+                        profiler.enable()
+                    except ValueError:
+                        profiler = None  # Another request on this process is already being profiled.
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+        finally:
+            _current.reset(token)
+
+        wall_ms = (time.perf_counter() - stats.started) * 1000
+        match = getattr(request, "resolver_match", None)
+        route = match.view_name if match else "<unresolved>"
+
+        sample = {
+            "route": route,
+            "method": request.method,
+            "status": response.status_code,
+            "wall_ms": round(wall_ms, 3),
+            "queries": stats.queries,
+            "db_ms": round(stats.db_ms, 3),
+            "template_ms": round(stats.template_ms, 3),
+            "slowest_sql": stats.slowest_sql[:500],
+            "slowest_sql_ms": round(stats.slowest_sql_ms, 3),
+            "cache_hits": stats.cache_hits,
+            "cache_misses": stats.cache_misses,
+        }
+        window.add(route, sample)
+
+        if self.server_timing:
+            response["Server-Timing"] = (
+                f'db;dur={stats.db_ms:.1f};desc="{stats.queries} queries", '
+                f"tpl;dur={stats.template_ms:.1f}, "
+                f'cache;desc="hit={stats.cache_hits} miss={stats.cache_misses}", '
+                f"total;dur={wall_ms:.1f}"
+            )
+        if self.log_file:
+            with _log_lock, open(self.log_file, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(sample) + "\n")
+        if profiler is not None and wall_ms >= self.profile_slow_ms:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            name = f"{route.replace(':', '_')}-{int(time.time() * 1000)}-{wall_ms:.0f}ms.prof"
+            profiler.dump_stats(self.profile_dir / name)
+
+        return response
+
+
+@staff_member_required
+def perf_stats_view(request):
+    #Per-route latency percentiles for this worker process. POST with reset=1 clears the window.
+    from .cache import stats as cache_stats  # cache.py imports this module
+
+    if request.method == "POST" and request.POST.get("reset"):
+        window.reset()
+    return JsonResponse({
+        "sample_rate": getattr(settings, "PERF_SAMPLE_RATE", 1.0),
+        "routes": window.summary(),
+        "cache": cache_stats(),
+    })
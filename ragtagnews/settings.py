@@ -18,6 +18,7 @@ Generated by 'django-admin startproject' using Django 5.2.6.
 
 from pathlib import Path
 import os  # NEW
+import sys
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -39,6 +40,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'ragtagnews.perf.PerfMiddleware',  # first, so it times everything below it
+    'ragtagnews.db_router.ReplicaPinningMiddleware',  # read-your-writes for replica reads
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,6 +86,33 @@ AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator'},
 ]
 
+# --- Cache (no Redis): file-based and shared by all workers on the host ---
+# Hot paths put an in-process LRU in front of it; see ragtagnews/cache.py.
+# ragtagnews/filecache.py culls at most every CULL_INTERVAL seconds, expired entries first.
+CACHES = {
+    'default': {
+        'BACKEND': 'ragtagnews.filecache.FileCache',
+        'LOCATION': BASE_DIR / '.cache',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 50_000, 'CULL_INTERVAL': 60},
+    },
+}
+# `manage.py test` must not read or write the development cache directory.
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+if TESTING:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'TIMEOUT': 300}}
+CACHE_L1_MAX_ENTRIES        = 2000  # per-process LRU size
+CACHE_L1_SECONDS            = 30    # longest an L1 copy is trusted without re-reading L2
+CACHE_VERSION_CHECK_SECONDS = 2     # how quickly workers notice a namespace bump
+CACHE_LOCK_SECONDS          = 10    # single-flight lock / longest wait for another worker's recompute
+
+# --- Sessions / auth lookups served from cache ---
+# cached_db: reads hit the cache, writes go to both, so sessions survive a cache flush.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+AUTHENTICATION_BACKENDS = [
+    'Profile.backends.CachedModelBackend',  # caches request.user (+ profile, minus password) between requests
+]
+
 # --- I18N / TZ ---
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'America/Chicago'  # NEW: metering uses this as the "local day"
@@ -112,6 +142,54 @@ def _getbool(name: str, default: bool) -> bool:  # NEW
     val = str(os.getenv(name, str(default))).strip().lower()
     return val in ("1", "true", "yes", "on")
 
+def _getfloat(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+# --- Primary / read replicas (ragtagnews/db_router.py) ---
+# DB_ENGINE=postgresql: `default` is DB_HOST (the primary) and each of DB_REPLICA_HOSTS
+# (comma-separated) is a streaming replica. Otherwise SQLITE_REPLICAS=N adds N read-only
+# snapshot copies of db.sqlite3, refreshed by `manage.py sync_replicas`.
+if os.getenv("DB_ENGINE") == "postgresql":
+    _postgres = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.getenv("DB_NAME", "ragtagnews"),
+        'USER': os.getenv("DB_USER", "ragtagnews"),
+        'PASSWORD': os.getenv("DB_PASSWORD", ""),
+        'HOST': os.getenv("DB_HOST", "localhost"),
+        'PORT': os.getenv("DB_PORT", "5432"),
+    }
+    DATABASES = {'default': _postgres}
+    for _i, _host in enumerate(filter(None, os.getenv("DB_REPLICA_HOSTS", "").split(",")), start=1):
+        DATABASES[f'replica{_i}'] = {**_postgres, 'HOST': _host.strip(), 'TEST': {'MIRROR': 'default'}}
+    SQLITE_REPLICA_FILES = {}
+else:
+    SQLITE_REPLICA_FILES = {
+        f'replica{_i}': BASE_DIR / f'db-replica{_i}.sqlite3' for _i in range(1, _getint("SQLITE_REPLICAS", 0) + 1)
+    }
+    for _alias, _path in SQLITE_REPLICA_FILES.items():
+        DATABASES[_alias] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': f'file:{_path}?mode=ro',  # Django opens SQLite with uri=True
+            'TEST': {'MIRROR': 'default'},
+        }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['ragtagnews.db_router.PrimaryReplicaRouter']
+REPLICA_READ_MODELS = [  # read from a replica unless the request is pinned to the primary
+    "news.article", "news.headline", "news.source", "news.tag", "news.articletag",
+    "news.articledailyreads", "news.sourcedailyreads",
+]
+REPLICA_PIN_EXEMPT = ["news.readevent", "sessions.session"]  # writes that don't pin (every page makes them)
+# How often cron runs `sync_replicas` (SQLite snapshots are up to this much behind the primary).
+REPLICA_SYNC_SECONDS = _getint("REPLICA_SYNC_SECONDS", 60)
+# Covers replica lag after a user's write: one sync interval plus the copy itself for
+# SQLite snapshots, a few seconds for streaming replicas.
+REPLICA_STICKY_SECONDS = _getint(
+    "REPLICA_STICKY_SECONDS", REPLICA_SYNC_SECONDS + 30 if SQLITE_REPLICA_FILES else 10
+)
+
 # --- RSS feeds (you can add more) ---
 FEEDS: list[str] = [  # NEW
     "https://techcrunch.com/feed/",
@@ -122,9 +200,94 @@ FEEDS: list[str] = [  # NEW
 ]
 
 # --- Limits & refresh (class-friendly defaults) ---
+ANON_READS_PER_DAY     = _getint("ANON_READS_PER_DAY", 3)
+FREE_READS_PER_DAY     = _getint("FREE_READS_PER_DAY", 5)
+STANDARD_READS_PER_DAY = _getint("STANDARD_READS_PER_DAY", 11)
+READS_PER_DAY = {  # tiers missing here (premium) are not metered
+    "anonymous": ANON_READS_PER_DAY,
+    "free": FREE_READS_PER_DAY,
+    "standard": STANDARD_READS_PER_DAY,
+}
+PAID_TIERS = ("standard", "premium")  # may open tier="standard" articles
+STANDARD_SOURCES = ("techcrunch.com", "arstechnica.com")  # ingest creates their articles as tier="standard"
+DETAIL_CACHE_SECONDS   = _getint("DETAIL_CACHE_SECONDS", 24 * 60 * 60)  # pre-rendered detail bodies
+HEADLINES_CACHE_SECONDS = _getint("HEADLINES_CACHE_SECONDS", 5 * 60)     # ingest bumps the version on change
+# Namespace version markers (ragtagnews/cache.py) expire so per-article ones don't pile up. They must
+# outlast the longest ttl + stale_ttl stored under a namespace; an expired marker only causes misses.
+CACHE_NAMESPACE_SECONDS = DETAIL_CACHE_SECONDS + 60 * 60
 TTL_MINUTES            = _getint("TTL_MINUTES", 10)         # NEW
-LAZY_REFRESH           = _getbool("LAZY_REFRESH", True)     # NEW
 
 # Optional helpers used by commands/views
 FETCH_TIMEOUT_SECONDS  = _getint("FETCH_TIMEOUT_SECONDS", 5)   # NEW (RSS fetch timeout)
-MAX_SEARCH_RESULTS     = _getint("MAX_SEARCH_RESULTS", 50)     # NEW (cap search results)
\ No newline at end of file
+MAX_SEARCH_RESULTS     = _getint("MAX_SEARCH_RESULTS", 50)     # NEW (cap search results)
+ADMIN_COUNT_LIMIT      = _getint("ADMIN_COUNT_LIMIT", 10000)   # admin changelists stop counting here
+
+# --- Tags (news/tagging.py) ---
+TAG_ALLOWLIST = {  # tag -> feed categories / title keywords that map to it; others are dropped
+    "ai": ["artificial intelligence", "machine learning", "openai", "chatgpt", "llm"],
+    "apple": ["iphone", "ipad", "macos", "ios"],
+    "google": ["android", "alphabet"],
+    "microsoft": ["windows", "xbox"],
+    "security": ["cybersecurity", "privacy", "hacking", "malware", "ransomware"],
+    "science": ["space", "nasa", "climate"],
+    "startups": ["startup", "venture", "funding"],
+    "gaming": ["games", "video games"],
+    "policy": ["regulation", "government", "antitrust"],
+    "gadgets": ["hardware", "reviews"],
+}
+MAX_TAGS_PER_ARTICLE   = _getint("MAX_TAGS_PER_ARTICLE", 5)
+
+# --- Read rollups (news/rollups.py, manage.py rollup_reads) ---
+ROLLUP_BATCH_SIZE         = _getint("ROLLUP_BATCH_SIZE", 5000)       # ReadEvent rows per transaction
+ROLLUP_LAG_SECONDS        = _getint("ROLLUP_LAG_SECONDS", 60)        # leave very recent rows for the next run
+READ_EVENT_RETENTION_DAYS = _getint("READ_EVENT_RETENTION_DAYS", 35) # raw rows kept after rollup
+TRENDING_DAYS             = _getint("TRENDING_DAYS", 7)
+TRENDING_CACHE_SECONDS    = _getint("TRENDING_CACHE_SECONDS", 10 * 60)
+
+# --- Raw feed archive (news/archive.py, manage.py reprocess_archive) ---
+ARCHIVE_FEEDS          = _getbool("ARCHIVE_FEEDS", True)     # keep every changed feed body
+ARCHIVE_ROOT           = BASE_DIR / 'feed_archive'
+ARCHIVE_ZSTD_LEVEL     = _getint("ARCHIVE_ZSTD_LEVEL", 10)   # used when `zstandard` is installed (else gzip)
+
+# --- Bulk export/import (news/corpus.py, manage.py export_corpus / import_corpus) ---
+BULK_BATCH_SIZE        = _getint("BULK_BATCH_SIZE", 5000)      # rows per SELECT page / executemany
+BULK_CHUNK_ROWS        = _getint("BULK_CHUNK_ROWS", 500_000)   # rows per file (and per import transaction)
+
+# --- Daily digests (news/digests.py, manage.py build_digests) ---
+DIGEST_OUTBOX          = BASE_DIR / 'outbox'   # <date>/<tier>-<n>.mbox, picked up by the mailer
+DIGEST_FROM_EMAIL      = os.getenv("DIGEST_FROM_EMAIL", "The Egg <digest@theegg.example>")
+DIGEST_HEADLINES       = _getint("DIGEST_HEADLINES", 10)       # latest headlines per digest
+DIGEST_CHUNK_SIZE      = _getint("DIGEST_CHUNK_SIZE", 5000)    # envelopes per outbox file / worker task
+
+# --- Published feeds and sitemaps (news/publish.py, written after each ingest) ---
+SITE_URL           = os.getenv("SITE_URL", "http://localhost:8000")  # absolute links in feeds/sitemaps
+PUBLISH_ROOT       = BASE_DIR / 'published'  # the web server serves this directory at PUBLISH_URL
+PUBLISH_URL        = '/'                     # feeds/..., sitemap.xml, sitemaps/..., robots.txt
+PUBLISH_FEED_ITEMS = _getint("PUBLISH_FEED_ITEMS", 50)       # newest articles per feed
+SITEMAP_CHUNK_SIZE = _getint("SITEMAP_CHUNK_SIZE", 50_000)   # article ids per sitemap file (protocol max)
+
+# --- Thumbnails (publisher images proxied and resized locally) ---
+THUMBNAIL_ROOT          = BASE_DIR / 'thumbnails'
+THUMBNAIL_SIZES         = {"card": (400, 200), "detail": (800, 450)}  # (width, height) boxes
+THUMBNAIL_MAX_BYTES     = _getint("THUMBNAIL_MAX_BYTES", 5 * 1024 * 1024)  # refuse larger originals
+THUMBNAIL_MAX_PIXELS    = _getint("THUMBNAIL_MAX_PIXELS", 25_000_000)      # refuse to decode larger images
+THUMBNAIL_MAX_REDIRECTS = 3                   # each hop must resolve to a public address
+THUMBNAIL_FAILURE_SECONDS = _getint("THUMBNAIL_FAILURE_SECONDS", 60 * 60)  # failed images aren't retried sooner
+THUMBNAIL_CACHE_SECONDS = 60 * 60 * 24 * 365  # URLs are keyed by image, so cache "forever"
+
+# --- Request performance instrumentation (ragtagnews/perf.py) ---
+PERF_SAMPLE_RATE       = _getfloat("PERF_SAMPLE_RATE", 1.0 if DEBUG else 0.1)  # share of requests measured
+PERF_SERVER_TIMING     = _getbool("PERF_SERVER_TIMING", DEBUG)   # add a Server-Timing header
+PERF_WINDOW            = _getint("PERF_WINDOW", 1000)            # samples kept per route for /_perf/
+PERF_LOG_FILE          = os.getenv("PERF_LOG_FILE")              # optional JSON-lines log of every sample
+PERF_PROFILE_SLOW_MS   = _getint("PERF_PROFILE_SLOW_MS", 0)      # >0: dump cProfile for slower requests
+PERF_PROFILE_DIR       = BASE_DIR / 'profiles'
+
+# --- Cold-start budget (manage.py benchmark_startup) ---
+STARTUP_BUDGET_MS = {  # median wall time per target, fresh interpreter
+    "wsgi": _getint("STARTUP_BUDGET_WSGI_MS", 900),
+    "asgi": _getint("STARTUP_BUDGET_ASGI_MS", 900),
+    "manage.py check": _getint("STARTUP_BUDGET_CHECK_MS", 1500),
+    "manage.py ingest_news --help": _getint("STARTUP_BUDGET_INGEST_MS", 1500),
+}
+STARTUP_DEFERRED_MODULES = ["feedparser", "dateutil", "requests", "PIL"]  # must not load at worker boot
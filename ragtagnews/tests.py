@@ -0,0 +1,179 @@
+import re
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache as shared
+from django.http import HttpResponse
+from django.template import engines
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from . import cache, perf
+
+
+@override_settings(CACHE_LOCK_SECONDS=5)
+class CacheTests(SimpleTestCase):
+    """Single-flight recompute, stale serving, namespace versions and the L1 LRU."""
+
+    def setUp(self):
+        shared.clear()
+        cache.local.clear()
+
+    def leader(self, key, value):
+        """Starts a thread that computes `key` and holds the lock until the returned event is set."""
+        started, release, result = threading.Event(), threading.Event(), []
+
+        def compute():
+            started.set()
+            release.wait(5)
+            return value
+
+        thread = threading.Thread(target=lambda: result.append(cache.get_or_compute(key, compute, ttl=60)))
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(release.set)
+        self.assertTrue(started.wait(5))
+        return release, thread, result
+
+    def test_one_caller_computes_while_others_get_the_stale_value(self):
+        shared.set("k", ("old", time.time() - 1), 60)  # past its ttl, within stale_ttl
+        release, thread, result = self.leader("k", "new")
+
+        compute = mock.Mock(return_value="other")
+        for _ in range(3):
+            self.assertEqual(cache.get_or_compute("k", compute, ttl=60, use_local=False), "old")
+        compute.assert_not_called()
+
+        release.set()
+        thread.join()
+        self.assertEqual(result, ["new"])
+        self.assertEqual(cache.get_or_compute("k", compute, ttl=60), "new")
+        compute.assert_not_called()
+
+    def test_cold_key_waits_for_the_lock_holder(self):
+        release, thread, _ = self.leader("k", "value")
+        waits = cache.stats().get("lock_waits", 0)
+        compute = mock.Mock(return_value="other")
+        threading.Timer(0.2, release.set).start()
+
+        self.assertEqual(cache.get_or_compute("k", compute, ttl=60), "value")
+        compute.assert_not_called()
+        self.assertEqual(cache.stats()["lock_waits"], waits + 1)
+
+    def test_bump_orphans_the_namespace(self):
+        for name in ("a", "b", "c"):
+            cache.put("k", f"{name}1", ttl=60, namespace=name)
+        cache.bump("a")
+        cache.bump_many(["b"])
+
+        def get(name):
+            return cache.get_or_compute("k", lambda: f"{name}2", ttl=60, namespace=name)
+
+        self.assertEqual([get("a"), get("b"), get("c")], ["a2", "b2", "c1"])
+
+    def test_expired_marker_starts_a_new_version(self):
+        cache.put("k", "v1", ttl=60, namespace="n")
+        old_version = shared.get("ns:n")
+        # What expiry looks like from here: the marker is gone from L2 and L1.
+        shared.delete("ns:n")
+        cache.local.delete("ns:n")
+
+        self.assertEqual(cache.get_or_compute("k", lambda: "v2", ttl=60, namespace="n"), "v2")
+        self.assertNotIn(shared.get("ns:n"), (None, old_version))
+
+    def test_lru_evicts_the_least_recently_used(self):
+        lru = cache.LocalLRU(2)
+        evictions = cache.stats().get("evictions", 0)
+        far = time.time() + 60
+        lru.set("a", 1, far)
+        lru.set("b", 2, far)
+        lru.get("a", time.time())
+        lru.set("c", 3, far)
+
+        self.assertEqual(cache.stats()["evictions"], evictions + 1)
+        self.assertIs(lru.get("b", time.time()), cache._MISSING)
+        self.assertEqual([lru.get("a", time.time()), lru.get("c", time.time())], [1, 3])
+
+
+def _sample(wall_ms):
+    return {
+        "wall_ms": wall_ms, "queries": 1, "db_ms": 0.5, "template_ms": 0.25,
+        "cache_hits": 1, "cache_misses": 0, "slowest_sql": f"SELECT {wall_ms}", "slowest_sql_ms": wall_ms / 10,
+    }
+
+
+@override_settings(PERF_SAMPLE_RATE=1.0, PERF_SERVER_TIMING=True, PERF_LOG_FILE=None, PERF_PROFILE_SLOW_MS=0)
+class PerfMiddlewareTests(TestCase):
+    """Sampling, the Server-Timing header, route percentiles, /_perf/ access and slow-request profiles."""
+
+    def setUp(self):
+        perf.window.reset()
+        self.addCleanup(perf.window.reset)
+
+    def get(self, sleep=0):
+        def view(request):
+            User.objects.count()
+            User.objects.exists()
+            time.sleep(sleep)
+            return HttpResponse(engines["django"].from_string("{% for i in items %}{{ i }}{% endfor %}").render(
+                {"items": range(1000)}
+            ))
+
+        return perf.PerfMiddleware(view)(RequestFactory().get("/"))
+
+    @override_settings(PERF_SAMPLE_RATE=0.0)
+    def test_rate_zero_measures_nothing(self):
+        self.assertNotIn("Server-Timing", self.get())
+        self.assertEqual(perf.window.summary(), {})
+
+    def test_rate_one_measures_every_request(self):
+        for _ in range(3):
+            self.get()
+        self.assertEqual(perf.window.summary()["<unresolved>"]["count"], 3)
+
+    def test_server_timing_reports_queries_and_template_time(self):
+        header = self.get()["Server-Timing"]
+        self.assertIn('desc="2 queries"', header)
+        self.assertRegex(header, r"tpl;dur=\d+\.\d")
+        self.assertRegex(header, r"total;dur=\d+\.\d")
+        route = perf.window.summary()["<unresolved>"]
+        self.assertEqual(route["avg_queries"], 2)
+        self.assertGreater(route["avg_template_ms"], 0)
+
+    def test_summary_percentiles(self):
+        window = perf.RouteWindow()
+        for wall_ms in range(100, 0, -1):
+            window.add("home", _sample(wall_ms))
+        report = window.summary()["home"]
+        self.assertEqual(
+            (report["count"], report["p50_ms"], report["p95_ms"], report["p99_ms"]), (100, 50, 95, 99)
+        )
+        self.assertEqual(report["slowest_sql"], "SELECT 100")
+
+    def test_stats_endpoint_is_staff_only(self):
+        url = reverse("perf_stats")
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create(username="reader"))
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create(username="staff", is_staff=True))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("routes", response.json())
+
+    def test_slow_requests_are_profiled(self):
+        profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, profile_dir, ignore_errors=True)
+        with override_settings(PERF_PROFILE_SLOW_MS=5000, PERF_PROFILE_DIR=profile_dir):
+            self.get()
+        self.assertEqual(list(Path(profile_dir).iterdir()), [])
+
+        with override_settings(PERF_PROFILE_SLOW_MS=20, PERF_PROFILE_DIR=profile_dir):
+            self.get(sleep=0.05)
+        dumps = list(Path(profile_dir).iterdir())
+        self.assertEqual(len(dumps), 1)
+        self.assertTrue(re.fullmatch(r"<unresolved>-\d+-\d+ms\.prof", dumps[0].name))
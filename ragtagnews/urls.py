@@ -15,12 +15,22 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
+from django.views.static import serve
+
+from .perf import perf_stats_view
+
+# Published feeds/sitemaps are served by the web server in production; this is for runserver.
+# (Listed before the catch-all MEDIA_URL route below.)
+published = [
+    re_path(r'^(?P<path>(?:feeds|sitemaps)/.+|sitemap\.xml|robots\.txt)$', serve, {'document_root': settings.PUBLISH_ROOT}),
+] if settings.DEBUG else []
 
 urlpatterns = [
     path('', include('news.urls')), # Use include for the news app
     path('admin/', admin.site.urls),
+    path('_perf/', perf_stats_view, name='perf_stats'),
     path('Profile/', include('Profile.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+] + published + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)